@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""
+Compares how fast rows reach a database: through DBStorage.new() and
+save() per object, through new() for every object and one save(), and
+through DBStorage.bulk_new(); the first path is capped at 5000 rows.
+The database is a SQLite file standing in for MySQL; set HBNB_DB_URL
+to measure another one.
+
+Usage: python3 -m benchmarks.bench_bulk [number of places]
+"""
+import os
+import sys
+import tempfile
+import time
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+from models.engine.db_storage import DBStorage
+from benchmarks.bench_reload import rate
+
+
+def make_objects(count):
+    """Returns a state, a city, a user and count places, in FK order"""
+    state = State(name="California")
+    city = City(name="San Francisco", state_id=state.id)
+    user = User(email="a@b.c", password="pwd", first_name="A",
+                last_name="B")
+    places = [Place(city_id=city.id, user_id=user.id, name=f"place {i}",
+                    price_by_night=i % 500, latitude=37.7, longitude=-122.4)
+              for i in range(count)]
+    return [state, city, user] + places
+
+
+def bench(load, count, url):
+    """Returns the seconds load(storage, objects) takes on a new db"""
+    storage = DBStorage(url)
+    storage.reload()
+    objects = make_objects(count)
+    start = time.perf_counter()
+    load(storage, objects)
+    return time.perf_counter() - start
+
+
+def one_by_one(storage, objects):
+    """Adds and commits each object on its own"""
+    for obj in objects:
+        storage.new(obj)
+        storage.save()
+
+
+def one_save(storage, objects):
+    """Adds every object to the session, then commits once"""
+    for obj in objects:
+        storage.new(obj)
+    storage.save()
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print("{} places".format(count))
+    print("{:22} {:>9} {:>9} {:>14}".format(
+        'path', 'rows', 'seconds', 'rows/s'))
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, load, size in (
+                ('new() + save() each', one_by_one, min(count, 5000)),
+                ('new() + one save()', one_save, count),
+                ('bulk_new()', DBStorage.bulk_new, count)):
+            url = os.getenv('HBNB_DB_URL') or \
+                'sqlite:///' + os.path.join(tmp, name.split('(')[0] + '.db')
+            seconds = bench(load, size, url)
+            print("{:22} {:9} {:9.3f} {:14,.0f}".format(
+                name, size + 3, seconds, rate(size + 3, seconds)))
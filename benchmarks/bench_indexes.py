@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+"""
+Compares the latency of the lookups DBStorage filters on without and
+with the indexes declared on the models: a price range and a top-k by
+price on places, a nearby() search on (latitude, longitude), and a
+user by email. The dataset is generated in a SQLite file standing in
+for MySQL (set HBNB_DB_URL to use another, empty, database); the
+indexes are dropped first, then added back by storage.migrate().
+
+Usage: python3 -m benchmarks.bench_indexes [number of places]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from models.place import Place
+from models.user import User
+from models.engine.db_storage import DBStorage
+from models.engine.migrate import missing_indexes
+
+REPEAT = 20
+
+
+def make_objects(count, rand):
+    """Returns count / 2 users and count places spread over the globe"""
+    users = [User(email=f"user{i}@hbnb.io", password="pwd",
+                  first_name="A", last_name="B")
+             for i in range(max(1, count // 2))]
+    places = [Place(city_id="0001", user_id=rand.choice(users).id,
+                    name=f"place {i}", price_by_night=rand.randrange(1000),
+                    latitude=rand.uniform(-60, 70),
+                    longitude=rand.uniform(-180, 180))
+              for i in range(count)]
+    return users + places
+
+
+def lookups(storage, users):
+    """Returns [(name, function)] of the lookups to time"""
+    email = users[len(users) // 2].email
+    return [
+        ('price range', lambda: storage.query(Place).filter(
+            price_by_night__gte=500, price_by_night__lt=505).all()),
+        ('top 10 by price', lambda: storage.query(Place).order_by(
+            '-price_by_night').limit(10).all()),
+        ('nearby 50 km', lambda: storage.nearby(48.85, 2.35, 50)),
+        ('user by email', lambda: storage.query(User).filter(
+            email=email).first()),
+    ]
+
+
+def timed(lookup):
+    """Returns the mean seconds of lookup over REPEAT runs"""
+    start = time.perf_counter()
+    for i in range(REPEAT):
+        lookup()
+    return (time.perf_counter() - start) / REPEAT
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmp:
+        url = os.getenv('HBNB_DB_URL') or \
+            'sqlite:///' + os.path.join(tmp, 'hbnb.db')
+        storage = DBStorage(url)
+        storage.reload()
+        objects = make_objects(count, random.Random(1))
+        storage.bulk_new(objects)
+        engine = storage._DBStorage__engine
+        for index in {index for table in (Place.__table__, User.__table__)
+                      for index in table.indexes}:
+            index.drop(bind=engine)
+        users = [obj for obj in objects if isinstance(obj, User)]
+        before = [(name, timed(lookup))
+                  for name, lookup in lookups(storage, users)]
+        dropped = len(missing_indexes(engine))
+        start = time.perf_counter()
+        storage.migrate()
+        migration = time.perf_counter() - start
+        after = [timed(lookup) for name, lookup in lookups(storage, users)]
+        storage.close()
+    print("{} places, {} indexes added in {:.3f}s".format(
+        count, dropped, migration))
+    print("{:18} {:>12} {:>12} {:>9}".format(
+        'lookup', 'without ms', 'with ms', 'speedup'))
+    for (name, without), with_index in zip(before, after):
+        print("{:18} {:12.3f} {:12.3f} {:8.1f}x".format(
+            name, without * 1000, with_index * 1000,
+            without / with_index if with_index else float('inf')))
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+"""
+Compares how fast stored records become objects: through
+BaseModel.__init__(**record), through BaseModel.from_dict(record), and
+through a full FileStorage.reload(), which uses from_dict.
+
+Usage: python3 -m benchmarks.bench_reload [number of records]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from models.base_model import BaseModel
+from models.engine.file_storage import FileStorage
+from benchmarks.bench_serializers import make_records
+
+
+def rate(count, seconds):
+    """Returns a throughput in objects per second"""
+    return count / seconds if seconds else float('inf')
+
+
+def bench_build(build, records):
+    """Returns the seconds build takes over every record"""
+    start = time.perf_counter()
+    for record in records.values():
+        build(record)
+    return time.perf_counter() - start
+
+
+def bench_reload(records):
+    """Returns the seconds FileStorage.reload() takes on records"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with open('file.json', 'w') as f:
+                json.dump(records, f)
+            storage = FileStorage()
+            start = time.perf_counter()
+            storage.reload()
+            seconds = time.perf_counter() - start
+            storage.close()
+        finally:
+            os.chdir(cwd)
+    return seconds
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    records = make_records(count)
+    print("{} records".format(count))
+    print("{:22} {:>9} {:>14}".format('path', 'seconds', 'objects/s'))
+    for name, seconds in (
+            ('BaseModel(**record)',
+             bench_build(lambda record: BaseModel(**record), records)),
+            ('BaseModel.from_dict',
+             bench_build(BaseModel.from_dict, records)),
+            ('FileStorage.reload', bench_reload(records))):
+        print("{:22} {:9.3f} {:14,.0f}".format(
+            name, seconds, rate(count, seconds)))
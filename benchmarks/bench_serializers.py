@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Compares the JSON and binary FileStorage formats: save time, load
+time, load plus BaseModel hydration time, and file size.
+
+Usage: python3 -m benchmarks.bench_serializers [number of records]
+"""
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from models.base_model import BaseModel
+from models.engine.serializers import serializers
+
+
+def make_records(count):
+    """Returns count Place-like records, as to_dict builds them"""
+    now = datetime.utcnow().isoformat(timespec='microseconds')
+    records = {}
+    for i in range(count):
+        id = str(uuid.uuid4())
+        records['BaseModel.' + id] = {
+            '__class__': 'BaseModel', 'id': id,
+            'created_at': now, 'updated_at': now,
+            'city_id': str(uuid.uuid4()), 'user_id': str(uuid.uuid4()),
+            'name': 'Place {}'.format(i),
+            'description': 'A quiet flat close to the beach',
+            'number_rooms': i % 5, 'number_bathrooms': i % 3,
+            'max_guest': i % 8, 'price_by_night': 50 + i % 300,
+            'latitude': 37.77 + i / 1e6, 'longitude': -122.41 - i / 1e6,
+        }
+    return records
+
+
+def bench(serializer, records, path):
+    """Returns (save s, load s, load + hydrate s, size) for one format"""
+    mode = 'b' if serializer.binary else ''
+    start = time.perf_counter()
+    with open(path, 'w' + mode) as f:
+        serializer.dump(records, f)
+    save = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(path, 'r' + mode) as f:
+        for key, record in serializer.load(f):
+            pass
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(path, 'r' + mode) as f:
+        for key, record in serializer.load(f):
+            BaseModel(**record)
+    hydrate = time.perf_counter() - start
+
+    size = os.path.getsize(path)
+    os.remove(path)
+    return save, load, hydrate, size
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    records = make_records(count)
+    print("{} records".format(count))
+    print("{:8} {:>9} {:>9} {:>11} {:>12}".format(
+        'format', 'save s', 'load s', 'hydrate s', 'size bytes'))
+    for name, serializer in serializers.items():
+        path = 'bench_records' + serializer.extension
+        save, load, hydrate, size = bench(serializer, records, path)
+        print("{:8} {:9.3f} {:9.3f} {:11.3f} {:12}".format(
+            name, save, load, hydrate, size))
@@ -181,11 +181,11 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = c_name + "." + c_id
-        try:
-            print(storage._FileStorage__objects[key])
-        except KeyError:
+        instance = storage.get(c_name, c_id)
+        if instance is None:
             print("** no instance found **")
+        else:
+            print(instance)
 
     def help_show(self):
         """ Help information for the show command """
@@ -212,12 +212,12 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        for instance in storage.all(c_name).values():
-            if instance.id == c_id:
-                storage.delete(instance)
-                storage.save()
-                return
-        print("** no instance found **")
+        instance = storage.get(c_name, c_id)
+        if instance is None:
+            print("** no instance found **")
+            return
+        storage.delete(instance)
+        storage.save()
 
     def help_destroy(self):
         """ Help information for the destroy command """
@@ -249,15 +249,38 @@ class HBNBCommand(cmd.Cmd):
     def do_count(self, args):
         """Count current number of class instances"""
         count = 0
-        for k, v in storage._FileStorage__objects.items():
-            if args == k.split('.')[0]:
-                count += 1
+        if args in classes:
+            count = storage.count(args)
         print(count)
 
     def help_count(self):
         """ """
         print("Usage: count <class_name>")
 
+    def do_search(self, args):
+        """ Shows the objects of a class matching words, best first"""
+        args = args.partition(' ')
+        if not args[0]:
+            print("** class name missing **")
+            return
+        if args[0] not in classes:
+            print("** class doesn't exist **")
+            return
+        if not args[2].strip():
+            print("** search words missing **")
+            return
+        try:
+            found = storage.search(args[0], args[2])
+        except ValueError:
+            print("** class has no text fields **")
+            return
+        print([str(v) for v in found])
+
+    def help_search(self):
+        """ Help information for the search command """
+        print("Shows the objects of a class matching words, best first")
+        print("[Usage]: search <className> <words>\n")
+
     def do_update(self, args):
         """ Updates a certain object with new info """
         c_name = c_id = att_name = att_val = kwargs = ''
@@ -281,11 +304,9 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        # generate key from class and id
-        key = c_name + "." + c_id
-
-        # determine if key is present
-        if key not in storage.all():
+        # determine if the instance is present
+        new_dict = storage.get(c_name, c_id)
+        if new_dict is None:
             print("** no instance found **")
             return
 
@@ -318,9 +339,6 @@ class HBNBCommand(cmd.Cmd):
 
             args = [att_name, att_val]
 
-        # retrieve dictionary of current objects
-        new_dict = storage.all()[key]
-
         # iterate through attr names and values
         for i, att_name in enumerate(args):
             # block only runs on even iterations
@@ -336,8 +354,8 @@ class HBNBCommand(cmd.Cmd):
                 if att_name in HBNBCommand.types:
                     att_val = HBNBCommand.types[att_name](att_val)
 
-                # update dictionary with name, value pair
-                new_dict.__dict__.update({att_name: att_val})
+                # update the instance with name, value pair
+                setattr(new_dict, att_name, att_val)
 
         new_dict.save()  # save updates to file
 
@@ -1,16 +1,77 @@
 #!/usr/bin/python3
 """This module defines a base class for all models in our hbnb clone"""
+import json
 import uuid
 from datetime import datetime
 import models
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, event, inspect
 
 Base = declarative_base()
+_builders = {}
+_watchers = {}
+
+
+def watch(name, callback):
+    """
+    Has callback(obj, name) called after the attribute name of any
+    model is set or deleted
+    """
+    _watchers.setdefault(name, set()).add(callback)
+
+
+def _notify(obj, name):
+    """Calls the callbacks watching the attribute name"""
+    for callback in _watchers.get(name, ()):
+        callback(obj, name)
+
+
+def _builder(cls):
+    """
+    Returns a function building instances of cls from stored dicts:
+    mapped columns are set one by one so SQLAlchemy tracks them, the
+    other attributes are copied in one dict update
+    """
+    mapper = inspect(cls, raiseerr=False)
+    if mapper is not None:
+        new = mapper.class_manager.new_instance
+        fields = tuple(mapper.column_attrs.keys())
+    else:
+        def new():
+            return cls.__new__(cls)
+        fields = ()
+    parse = datetime.fromisoformat
+
+    def build(record):
+        """Builds one instance from record"""
+        obj = new()
+        attrs = obj.__dict__
+        attrs.update(record)
+        attrs.pop('__class__', None)
+        for name in ('created_at', 'updated_at'):
+            value = attrs.get(name)
+            if name not in attrs:
+                attrs[name] = datetime.utcnow()
+            elif not isinstance(value, datetime):
+                attrs[name] = parse(value)
+        if 'id' not in attrs:
+            attrs['id'] = str(uuid.uuid4())
+        for name in fields:
+            if name in attrs:
+                setattr(obj, name, attrs.pop(name))
+        return obj
+    return build
 
 
 class BaseModel:
-    """A base class for all hbnb models"""
+    """
+    A base class for all hbnb models
+
+    to_dict(), to_json() and __str__() are cached in _cached until an
+    attribute is set or deleted. A value changed in place, like a list that is
+    appended to, must be set again to be seen.
+    """
+    __slots__ = ('_cached', '__dict__', '__weakref__')
 
     id = Column(String(60), primary_key=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow())
@@ -20,7 +81,8 @@ class BaseModel:
         """Instatntiates a new model"""
         if kwargs:
             for key, value in kwargs.items():
-                if key in ('updated_at', 'created_at'):
+                if key in ('updated_at', 'created_at') and \
+                        not isinstance(value, datetime):
                     value = datetime.strptime(
                         value, '%Y-%m-%dT%H:%M:%S.%f')
                 if key != '__class__':
@@ -37,13 +99,52 @@ class BaseModel:
             self.created_at = datetime.utcnow()
             self.updated_at = datetime.utcnow()
 
+    @classmethod
+    def from_dict(cls, record):
+        """
+        Builds an instance from a dict made by to_dict(), like
+        cls(**record) but without going through __init__
+        """
+        build = _builders.get(cls)
+        if build is None:
+            build = _builders[cls] = _builder(cls)
+        return build(record)
+
+    def __setattr__(self, name, value):
+        """Sets an attribute and drops the cached forms"""
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_cached', None)
+        if name in _watchers:
+            _notify(self, name)
+
+    def __delattr__(self, name):
+        """Deletes an attribute and drops the cached forms"""
+        object.__delattr__(self, name)
+        object.__setattr__(self, '_cached', None)
+        if name in _watchers:
+            _notify(self, name)
+
+    def _uncache(self):
+        """Drops the cached to_dict(), to_json() and __str__() forms"""
+        object.__setattr__(self, '_cached', None)
+
+    def __cache(self):
+        """Returns the [to_dict, str, to_json] cache of the instance"""
+        cached = getattr(self, '_cached', None)
+        if cached is None:
+            cached = [None, None, None]
+            object.__setattr__(self, '_cached', cached)
+        return cached
+
     def __str__(self):
         """Returns a string representation of the instance"""
-        cls = self.__class__.__name__
-        dictionary = self.__dict__.copy()
-        dictionary.pop("_sa_instance_state", None)
-
-        return f'[{cls}] ({self.id}) {dictionary}'
+        cached = self.__cache()
+        if cached[1] is None:
+            cls = self.__class__.__name__
+            dictionary = self.__dict__.copy()
+            dictionary.pop("_sa_instance_state", None)
+            cached[1] = f'[{cls}] ({self.id}) {dictionary}'
+        return cached[1]
 
     def __repr__(self):
         """Returns a string representation of the instance"""
@@ -61,17 +162,43 @@ class BaseModel:
 
     def to_dict(self):
         """Convert instance into dict format"""
-        dictionary = {}
-        dictionary.update(self.__dict__)
-        dictionary.update(
-            {'__class__': self.__class__.__name__})
-        dictionary['created_at'] = self.created_at.isoformat()
-        dictionary['updated_at'] = self.updated_at.isoformat()
-        if '_sa_instance_state' in dictionary:
-            del dictionary['_sa_instance_state']
+        cached = self.__cache()
+        if cached[0] is None:
+            dictionary = {}
+            dictionary.update(self.__dict__)
+            dictionary.update(
+                {'__class__': self.__class__.__name__})
+            dictionary['created_at'] = self.created_at.isoformat()
+            dictionary['updated_at'] = self.updated_at.isoformat()
+            if '_sa_instance_state' in dictionary:
+                del dictionary['_sa_instance_state']
+            cached[0] = dictionary
+        return dict(cached[0])
 
-        return dictionary
+    def to_json(self, encode=json.dumps):
+        """
+        Returns the dict form encoded by encode, JSON text by default;
+        the text is cached, so encode must not change between calls
+        """
+        cached = self.__cache()
+        if cached[2] is None:
+            if cached[0] is None:
+                self.to_dict()
+            cached[2] = encode(cached[0])
+        return cached[2]
 
     def delete(self):
         """Delete current instance from storage"""
         models.storage.delete(self)
+
+
+@event.listens_for(Base, 'expire', propagate=True)
+def _expired(target, attrs):
+    """Drops the cached forms of a mapped object SQLAlchemy expires"""
+    target._uncache()
+
+
+@event.listens_for(Base, 'refresh', propagate=True)
+def _refreshed(target, context, attrs):
+    """Drops the cached forms of a mapped object SQLAlchemy reloads"""
+    target._uncache()
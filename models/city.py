@@ -1,9 +1,11 @@
 #!/usr/bin/python3
 """ City Module for HBNB project """
 
+import os
 from models.base_model import BaseModel, Base
 from sqlalchemy import String, Column, ForeignKey
 from sqlalchemy.orm import relationship
+import models
 
 
 class City(BaseModel, Base):
@@ -14,3 +16,10 @@ class City(BaseModel, Base):
     name = Column(String(128), nullable=False)
     state_id = Column(String(60), ForeignKey("states.id"), nullable=False)
     places = relationship("Place", backref="cities", cascade="delete")
+
+    if os.getenv('HBNB_TYPE_STORAGE') != 'db':
+
+        @property
+        def places(self):
+            """places getter to retrieve the places of the city"""
+            return models.storage.related(self, 'places')
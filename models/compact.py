@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+"""
+This module builds compact, slot-based twins of the hbnb models
+
+compact(State) returns a class named State whose instances keep the
+declared fields (the Columns, or the plain class attributes of the
+unmapped models) in __slots__ instead of a per-instance __dict__.
+Other attributes set with setattr go to an _extra dict, which is only
+created for an instance the first time one is set. The twins have the
+same to_dict(), __str__(), save() and delete() and the same properties,
+like State.cities, but they are not instances of the model class.
+"""
+import json
+import sys
+import uuid
+from datetime import datetime
+from sqlalchemy import Column
+from sqlalchemy.orm.attributes import QueryableAttribute
+from models.base_model import BaseModel, _notify, _watchers
+
+_compact = {}
+
+
+class CompactModel:
+    """Base of the slot-based model twins"""
+    __slots__ = ('_extra',)
+    _fields = ()
+    _slots = frozenset()
+    _defaults = {}
+
+    save = BaseModel.save
+    delete = BaseModel.delete
+
+    def __init__(self, *args, **kwargs):
+        """
+        Instantiates a new model, like BaseModel.__init__. Foreign keys
+        are interned, and equal timestamps share one datetime, so the
+        objects of a bulk load do not each hold their own copy.
+        """
+        parsed = {}
+        for key, value in kwargs.items():
+            if key in ('updated_at', 'created_at') and \
+                    not isinstance(value, datetime):
+                if value not in parsed:
+                    parsed[value] = datetime.strptime(
+                        value, '%Y-%m-%dT%H:%M:%S.%f')
+                value = parsed[value]
+            elif key.endswith('_id') and type(value) is str:
+                value = sys.intern(value)
+            if key != '__class__':
+                self.__setattr__(key, value)
+        if 'id' not in kwargs:
+            object.__setattr__(self, 'id', str(uuid.uuid4()))
+        if 'created_at' not in kwargs:
+            object.__setattr__(self, 'created_at', datetime.utcnow())
+        if 'updated_at' not in kwargs:
+            object.__setattr__(self, 'updated_at', datetime.utcnow())
+
+    @classmethod
+    def from_dict(cls, record):
+        """Builds an instance from a dict made by to_dict()"""
+        return cls(**record)
+
+    def __setattr__(self, name, value):
+        """Sets a field slot, or an attribute of the extra dict"""
+        if name in self._slots:
+            object.__setattr__(self, name, value)
+        else:
+            try:
+                extra = object.__getattribute__(self, '_extra')
+            except AttributeError:
+                extra = {}
+                object.__setattr__(self, '_extra', extra)
+            extra[name] = value
+        if name in _watchers:
+            _notify(self, name)
+
+    def __getattr__(self, name):
+        """Returns an extra attribute, or the default of a field"""
+        try:
+            return object.__getattribute__(self, '_extra')[name]
+        except (AttributeError, KeyError):
+            pass
+        try:
+            return self._defaults[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def _items(self):
+        """Returns the attributes set on the instance, as a dict"""
+        dictionary = {}
+        for name in self._fields:
+            try:
+                dictionary[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        try:
+            dictionary.update(object.__getattribute__(self, '_extra'))
+        except AttributeError:
+            pass
+        return dictionary
+
+    def __str__(self):
+        """Returns a string representation of the instance"""
+        return f'[{type(self).__name__}] ({self.id}) {self._items()}'
+
+    def to_dict(self):
+        """Convert instance into dict format"""
+        dictionary = self._items()
+        dictionary['__class__'] = type(self).__name__
+        for name in ('created_at', 'updated_at'):
+            if isinstance(dictionary.get(name), datetime):
+                dictionary[name] = dictionary[name].isoformat()
+        return dictionary
+
+    def to_json(self, encode=json.dumps):
+        """
+        Returns the dict form encoded by encode, JSON text by default;
+        the twins do not cache it, to stay small
+        """
+        return encode(self.to_dict())
+
+    def _copy_from(self, other):
+        """Replaces every attribute with the ones of other"""
+        for name in self._fields + ('_extra',):
+            try:
+                object.__delattr__(self, name)
+            except AttributeError:
+                pass
+        for name, value in other._items().items():
+            setattr(self, name, value)
+
+
+def _fields(cls):
+    """
+    Returns (field names, defaults, other class members) of a model:
+    its table columns if it is mapped, else its Column attributes, and
+    its plain class attributes, like Place.amenity_ids, with their
+    values as defaults
+    """
+    fields = {}
+    members = {}
+    table = getattr(cls, '__table__', None)
+    if table is not None:
+        fields.update((name, None) for name in table.columns.keys())
+    for klass in reversed(cls.__mro__):
+        if klass in (object, BaseModel) or klass.__module__ == \
+                'sqlalchemy.orm.decl_api':
+            continue
+        for name, value in vars(klass).items():
+            if name.startswith('__') or name in fields:
+                continue
+            if isinstance(value, Column):
+                fields[name] = None
+            elif isinstance(value, QueryableAttribute):
+                continue
+            elif isinstance(value, (property, staticmethod, classmethod)) \
+                    or callable(value):
+                members[name] = value
+            elif not name.startswith('_'):
+                fields[name] = value
+    for name in ('id', 'created_at', 'updated_at'):
+        fields.setdefault(name, None)
+    return fields, members
+
+
+def compact(cls):
+    """Returns the compact twin of a model class, built once"""
+    twin = _compact.get(cls)
+    if twin is None:
+        fields, members = _fields(cls)
+        namespace = dict(members)
+        namespace.update({
+            '__slots__': tuple(fields),
+            '__module__': cls.__module__,
+            '__doc__': cls.__doc__,
+            '_fields': tuple(fields),
+            '_slots': frozenset(fields),
+            '_defaults': fields,
+        })
+        twin = _compact[cls] = type(cls.__name__, (CompactModel,),
+                                    namespace)
+    return twin
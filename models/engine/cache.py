@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+"""
+This module defines the read-through object cache of DBStorage
+
+ObjectCache keeps, for each class it has a policy for, the objects
+read by id in a least recently used order, and the result set of the
+last all(cls). A policy is (ttl, max_size): entries older than ttl
+seconds (None for no limit) are read again, and the least recently
+used objects are dropped past max_size. The storage drops the entries
+of a class when it adds, deletes or saves objects of that class.
+
+The cached objects belong to the session that read them, so
+DBStorage merges them into the session of the thread that asks for
+them before handing them out.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_CLASSES = ('State', 'Amenity')
+CACHE_SIZE = 10000
+
+
+def parse_policies(spec, max_size=CACHE_SIZE):
+    """
+    Returns {class name: (ttl, max_size)} from a comma separated list
+    of "<class>[:<ttl>[:<max size>]]", like "State:300,Amenity",
+    or "1" for CACHE_CLASSES without a ttl
+    """
+    if spec == '1':
+        spec = ','.join(CACHE_CLASSES)
+    policies = {}
+    for item in spec.split(','):
+        if not item:
+            continue
+        name, ttl, size = (item.split(':') + [None, None])[:3]
+        policies[name] = (float(ttl) if ttl else None,
+                          int(size) if size else max_size)
+    return policies
+
+
+class ObjectCache:
+    """Objects by class and id, and result sets by class, with counters"""
+
+    def __init__(self, policies):
+        """Starts empty, caching the classes of policies only"""
+        self.policies = dict(policies)
+        self.__lock = threading.Lock()
+        self.objects = {name: OrderedDict() for name in self.policies}
+        self.results = {}
+        self.hits = dict.fromkeys(self.policies, 0)
+        self.misses = dict.fromkeys(self.policies, 0)
+
+    def __contains__(self, cls_name):
+        """Tells if objects of class cls_name are cached"""
+        return cls_name in self.policies
+
+    def __expires(self, cls_name):
+        """Returns when an entry of class cls_name made now expires"""
+        ttl = self.policies[cls_name][0]
+        return None if ttl is None else time.monotonic() + ttl
+
+    @staticmethod
+    def __fresh(expires):
+        """Tells if an entry expiring at expires can still be used"""
+        return expires is None or time.monotonic() < expires
+
+    def __count(self, cls_name, found):
+        """Counts a hit or a miss, passing found through"""
+        if found is None:
+            self.misses[cls_name] += 1
+        else:
+            self.hits[cls_name] += 1
+        return found
+
+    def get(self, cls_name, id):
+        """Returns the cached object of class cls_name with id, or None"""
+        if cls_name not in self.policies:
+            return None
+        with self.__lock:
+            objects = self.objects[cls_name]
+            entry = objects.get(id)
+            if entry is None or not self.__fresh(entry[0]):
+                objects.pop(id, None)
+                return self.__count(cls_name, None)
+            objects.move_to_end(id)
+            return self.__count(cls_name, entry[1])
+
+    def put(self, cls_name, id, obj):
+        """Caches obj as the object of class cls_name with id"""
+        if cls_name not in self.policies:
+            return
+        with self.__lock:
+            self.__put(cls_name, id, obj, self.__expires(cls_name))
+
+    def __put(self, cls_name, id, obj, expires):
+        """Caches obj, dropping the least recently used past max_size"""
+        objects = self.objects[cls_name]
+        objects[id] = (expires, obj)
+        objects.move_to_end(id)
+        while len(objects) > self.policies[cls_name][1]:
+            objects.popitem(last=False)
+
+    def all(self, cls_name):
+        """Returns a copy of the cached all(cls_name), or None"""
+        if cls_name not in self.policies:
+            return None
+        with self.__lock:
+            entry = self.results.get(cls_name)
+            if entry is None or not self.__fresh(entry[0]):
+                self.results.pop(cls_name, None)
+                return self.__count(cls_name, None)
+            return self.__count(cls_name, dict(entry[1]))
+
+    def put_all(self, cls_name, objects):
+        """Caches objects, {"<class>.<id>": object}, as all(cls_name)"""
+        if cls_name not in self.policies:
+            return
+        with self.__lock:
+            expires = self.__expires(cls_name)
+            self.results[cls_name] = (expires, dict(objects))
+            for key, obj in objects.items():
+                self.__put(cls_name, key.partition('.')[2], obj, expires)
+
+    def discard(self, cls_name, id=None):
+        """Drops the result set of class cls_name, and its object id"""
+        if cls_name not in self.policies:
+            return
+        with self.__lock:
+            self.results.pop(cls_name, None)
+            if id is not None:
+                self.objects[cls_name].pop(id, None)
+
+    def clear(self):
+        """Drops every entry, keeping the counters"""
+        with self.__lock:
+            self.results.clear()
+            for objects in self.objects.values():
+                objects.clear()
+
+    def stats(self):
+        """Returns {class name: {"hits", "misses", "size"}}"""
+        with self.__lock:
+            return {name: {'hits': self.hits[name],
+                           'misses': self.misses[name],
+                           'size': len(self.objects[name])}
+                    for name in self.policies}
@@ -2,14 +2,66 @@
 """DBStorage class defenition"""
 
 import os
-from sqlalchemy import (create_engine)
+from contextlib import contextmanager
+from itertools import chain
+from math import pi
+from sqlalchemy import (
+    case, create_engine, func, insert, inspect, or_, select)
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import (
     sessionmaker,
     scoped_session,
-    relationship
+    relationship,
+    joinedload,
+    lazyload,
+    raiseload,
+    selectinload,
+    subqueryload
 )
 from models.base_model import Base
 from models import classes
+from models.engine.cache import CACHE_SIZE, ObjectCache, parse_policies
+from models.engine.migrate import add_missing_indexes
+from models.engine.pool import MeteredQueuePool
+from models.engine.geo_index import (
+    EARTH_RADIUS_KM, bounding_box, distances, is_coordinate, point)
+from models.engine.query import Query, LOOKUPS
+from models.engine.text_index import (
+    TEXT_FIELDS, TextIndex, document, tokenize)
+
+
+def _escape_like(word):
+    """Returns word with the LIKE wildcards escaped by a backslash"""
+    return word.replace('\\', '\\\\').replace('%', '\\%') \
+        .replace('_', '\\_')
+
+
+STRATEGIES = {
+    'selectin': selectinload,
+    'joined': joinedload,
+    'subquery': subqueryload,
+    'lazy': lazyload,
+    'raise': raiseload,
+}
+
+
+def parse_strategies(spec):
+    """
+    Returns {"<class>.<relationship>": strategy} from a comma separated
+    list of "<class>.<relationship>[:<strategy>]", like
+    "State.cities,City.places:joined"; the strategy is "selectin"
+    unless given, and must be one of STRATEGIES
+    """
+    strategies = {}
+    for item in spec.split(','):
+        if not item:
+            continue
+        name, _, strategy = item.partition(':')
+        strategy = strategy or 'selectin'
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown loading strategy {strategy}")
+        strategies[name] = strategy
+    return strategies
 
 
 class DBStorage:
@@ -17,34 +69,199 @@ class DBStorage:
 
     __engine (sqlalchemy.engine): hold the db engine
 
-    __session (sqlalchemy.orm.Session): hold the session
+    __session (sqlalchemy.orm.scoped_session): hold the session of
+    each thread
+
+    The session of a thread inside a transaction() block holds True
+    under "hbnb.transaction" in its info dict, so that only the saves
+    of that thread wait for the block to end.
+
+    __cache (ObjectCache): the read-through cache of some classes,
+    or None
+
+    __eager (dict): the default loading strategy of some relationships
     '''
     __engine = None
     __session = None
+    __cache = None
+    __eager = {}
 
-    def __init__(self):
-        db_user = os.getenv('HBNB_MYSQL_USER')
-        db_pwd = os.getenv('HBNB_MYSQL_PWD')
-        db_host = os.getenv('HBNB_MYSQL_HOST')
-        db_name = os.getenv('HBNB_MYSQL_DB')
+    def __init__(self, url=None, pool_size=None, max_overflow=None,
+                 pool_timeout=None, pool_recycle=None, liveness=None,
+                 cache=None, eager=None):
+        """
+        Connects to the MySQL database of the HBNB_MYSQL_* variables,
+        or to url (HBNB_DB_URL), like "sqlite:///hbnb.db", through a
+        MeteredQueuePool:
 
-        self.__engine = create_engine(
-            f"mysql+mysqldb://{db_user}:{db_pwd}@{db_host}/{db_name}",
-            pool_pre_ping=True)
+        pool_size (HBNB_DB_POOL_SIZE, 5) connections are kept open,
+        and up to max_overflow (HBNB_DB_MAX_OVERFLOW, 10) more are
+        opened under load. A checkout waits pool_timeout seconds
+        (HBNB_DB_POOL_TIMEOUT, 30) for a free connection, and
+        connections are replaced after pool_recycle seconds
+        (HBNB_DB_POOL_RECYCLE, 3600).
+
+        liveness (HBNB_DB_LIVENESS) is "pessimistic", the default,
+        to ping every connection when it is checked out, or
+        "optimistic" to skip the ping: a connection found dead then
+        fails its statement once, and the pool drops every connection
+        opened before it.
+
+        cache (HBNB_DB_CACHE) lists the classes whose all(cls) results
+        and objects are kept in an ObjectCache, like "State:300,Amenity"
+        for a 300 second ttl on states and none on amenities, or "1"
+        for CACHE_CLASSES; each class keeps up to HBNB_DB_CACHE_SIZE
+        objects (10000) unless its entry ends with ":<max size>".
+
+        eager (HBNB_DB_EAGER) sets the default loading strategy of
+        relationships, like "State.cities,City.places:joined" (see
+        parse_strategies): all() loads them along with their class.
+        """
+        if url is None:
+            url = os.getenv('HBNB_DB_URL')
+        if url is None:
+            db_user = os.getenv('HBNB_MYSQL_USER')
+            db_pwd = os.getenv('HBNB_MYSQL_PWD')
+            db_host = os.getenv('HBNB_MYSQL_HOST')
+            db_name = os.getenv('HBNB_MYSQL_DB')
+            url = f"mysql+mysqldb://{db_user}:{db_pwd}@{db_host}/{db_name}"
+        if pool_size is None:
+            pool_size = int(os.getenv('HBNB_DB_POOL_SIZE', 5))
+        if max_overflow is None:
+            max_overflow = int(os.getenv('HBNB_DB_MAX_OVERFLOW', 10))
+        if pool_timeout is None:
+            pool_timeout = float(os.getenv('HBNB_DB_POOL_TIMEOUT', 30))
+        if pool_recycle is None:
+            pool_recycle = int(os.getenv('HBNB_DB_POOL_RECYCLE', 3600))
+        if liveness is None:
+            liveness = os.getenv('HBNB_DB_LIVENESS', 'pessimistic')
+        if liveness not in ('pessimistic', 'optimistic'):
+            raise ValueError(
+                "liveness must be 'pessimistic' or 'optimistic'")
+        self.liveness = liveness
+        if cache is None:
+            cache = os.getenv('HBNB_DB_CACHE')
+        if isinstance(cache, str):
+            cache = parse_policies(
+                cache, int(os.getenv('HBNB_DB_CACHE_SIZE', CACHE_SIZE)))
+        if cache:
+            self.__cache = ObjectCache(cache)
+        if eager is None:
+            eager = os.getenv('HBNB_DB_EAGER', '')
+        if isinstance(eager, str):
+            eager = parse_strategies(eager)
+        self.__eager = dict(eager)
+
+        url = make_url(url)
+        if url.get_backend_name() == 'sqlite' and \
+                url.database in (None, '', ':memory:'):
+            # every connection to an in-memory database is a new one
+            self.__engine = create_engine(url)
+        else:
+            self.__engine = create_engine(
+                url, poolclass=MeteredQueuePool, pool_size=pool_size,
+                max_overflow=max_overflow, pool_timeout=pool_timeout,
+                pool_recycle=pool_recycle,
+                pool_pre_ping=liveness == 'pessimistic')
 
         if os.getenv('HBNB_ENV') == 'test':
             Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
+    def pool_metrics(self):
+        """
+        Returns the state of the connection pool: its size, the
+        connections checked out and in overflow, and the checkout
+        counters and latency histogram of MeteredQueuePool
+        """
+        pool = self.__engine.pool
+        metrics = {'pool': pool.status()}
+        if isinstance(pool, MeteredQueuePool):
+            metrics.update(size=pool.size(), checked_out=pool.checkedout(),
+                           overflow=max(0, pool.overflow()),
+                           **pool.metrics.snapshot())
+        return metrics
+
+    def cache_stats(self):
+        """Returns the hits, misses and size of the cache, per class"""
+        return self.__cache.stats() if self.__cache else {}
+
+    def __invalidate(self):
+        """Drops the cache entries of the objects the session changed"""
+        if self.__cache:
+            for obj in chain(self.__session.new, self.__session.dirty,
+                             self.__session.deleted):
+                self.__cache.discard(type(obj).__name__, obj.id)
+
+    @staticmethod
+    def __relation(owner, name):
+        """Returns the relationship attribute name of class owner"""
+        mapper = inspect(owner, raiseerr=False)
+        if mapper is None or name not in mapper.relationships:
+            raise ValueError(f"{owner.__name__} has no relation {name}")
+        return getattr(owner, name)
+
+    def __chain(self, option, owner, name, strategy=None):
+        """
+        Returns option extended to the relationship name of owner,
+        loaded with strategy or its default one, and the related class
+        """
+        attr = self.__relation(owner, name)
+        strategy = strategy or self.__eager.get(
+            f"{owner.__name__}.{name}", 'lazy')
+        if option is None:
+            option = STRATEGIES[strategy](attr)
+        else:
+            option = getattr(option, STRATEGIES[strategy].__name__)(attr)
+        return option, attr.property.mapper.class_
+
+    def __load_options(self, cls, load=()):
+        """
+        Returns the loader options of a query on cls: the relationships
+        with a default strategy, followed from cls, and the paths of
+        load, like "cities.places", eagerly loaded all along
+        """
+        options = []
+
+        def follow(owner, option, seen):
+            """Adds the default strategies reached from owner"""
+            for key in self.__eager:
+                owner_name, _, name = key.partition('.')
+                if owner_name != owner.__name__:
+                    continue
+                found, target = self.__chain(option, owner, name)
+                options.append(found)
+                if target not in seen:
+                    follow(target, found, seen | {target})
+
+        follow(cls, None, {cls})
+        for path in load:
+            option, owner = None, cls
+            for name in path.split('.'):
+                strategy = self.__eager.get(f"{owner.__name__}.{name}")
+                if strategy in (None, 'lazy', 'raise'):
+                    strategy = 'selectin'
+                option, owner = self.__chain(option, owner, name, strategy)
+            options.append(option)
+        return options
+
+    def all(self, cls=None, load=None):
         """
         Returns all records in the db
         if cls is set return a filtered list
         depending on cls
+
+        load lists relationship paths of cls to load along with it,
+        like ["cities.places"] for all(State), in a fixed number of
+        queries instead of one per parent; such a call does not go
+        through the cache
         """
         dictionary = {}
         objs = classes.copy()
-        results = []
+        if load and not cls:
+            raise ValueError("load needs a class")
         if cls:
+            if not isinstance(cls, str):
+                cls = cls.__name__
             try:
                 clsobj = classes[cls]
             except KeyError:
@@ -52,26 +269,319 @@ class DBStorage:
             else:
                 objs = {cls: clsobj}
 
-        for obj in objs.values():
-            results.extend(self.__session.query(obj).all())
-        for instance in results:
-            key = f"{type(instance).__name__}.{instance.id}"
-            dictionary[key] = instance
+        for name, obj in objs.items():
+            found = None
+            if self.__cache and not load:
+                found = self.__cache.all(name)
+            if found is not None:
+                found = {key: self.__attach(instance)
+                         for key, instance in found.items()}
+                if None in found.values():
+                    found = None
+            if found is None:
+                query = self.__session.query(obj)
+                if self.__eager or load:
+                    query = query.options(
+                        *self.__load_options(obj, load or ()))
+                found = {f"{type(instance).__name__}.{instance.id}": instance
+                         for instance in query.all()}
+                if self.__cache and not load:
+                    self.__cache.put_all(name, found)
+            dictionary.update(found)
 
         return dictionary
 
+    def __attach(self, obj):
+        """
+        Returns the instance of the calling thread's session standing
+        for obj, a cached object that may belong to the session of
+        another thread or to a closed one: the session's own instance,
+        or else a copy of obj merged into it without a query. Returns
+        None when obj has changes not saved yet, which only its own
+        session may see.
+        """
+        session = self.__session()
+        state = inspect(obj)
+        found = session.identity_map.get(state.key)
+        if found is not None:
+            return found
+        if state.modified:
+            return None
+        return session.merge(obj, load=False)
+
+    def get(self, cls, id):
+        """
+        Returns the object of class cls with the given id, or None,
+        from the cache or the session before querying its primary key
+        """
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None or inspect(cls, raiseerr=False) is None:
+            return None
+        obj = self.__cache.get(cls.__name__, id) if self.__cache else None
+        if obj is not None:
+            obj = self.__attach(obj)
+        if obj is None:
+            obj = self.__session.get(cls, id)
+            if obj is not None and self.__cache:
+                self.__cache.put(cls.__name__, id, obj)
+        return obj
+
+    def count(self, cls=None):
+        """
+        Returns the number of rows of class cls, or of every mapped
+        class, with SELECT COUNT(*)
+        """
+        if cls is None:
+            return sum(self.count(mapped) for mapped in classes.values()
+                       if inspect(mapped, raiseerr=False) is not None)
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls is None or inspect(cls, raiseerr=False) is None:
+            return 0
+        statement = select(func.count()).select_from(cls)
+        return self.__session.execute(statement).scalar_one()
+
     def new(self, obj):
         """add the object to the current database session """
         self.__session.add(obj)
+        if self.__cache:
+            self.__cache.discard(type(obj).__name__, obj.id)
+
+    def bulk_new(self, objects, batch_size=1000):
+        """
+        Inserts objects with one executemany INSERT per batch_size
+        rows of a table, the tables in foreign key order, then commits
+        unless a transaction() block will do it. The rows skip the
+        session, so the objects are not attached to it.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        rows = {}
+        names = set()
+        for obj in objects:
+            mapper = inspect(type(obj), raiseerr=False)
+            if mapper is None:
+                raise ValueError(f"{type(obj).__name__} is not mapped")
+            table = mapper.local_table
+            row = {}
+            for column in table.columns:
+                value = getattr(obj, column.key, None)
+                default = column.default
+                if value is None and default is not None and \
+                        default.is_scalar:
+                    value = default.arg
+                row[column.key] = value
+            rows.setdefault(table, []).append(row)
+            names.add(type(obj).__name__)
+        for table in Base.metadata.sorted_tables:
+            batch = rows.get(table, [])
+            for i in range(0, len(batch), batch_size):
+                self.__session.execute(insert(table),
+                                       batch[i:i + batch_size])
+        if self.__cache:
+            for name in names:
+                self.__cache.discard(name)
+        self.save()
 
     def save(self):
-        """commit all changes to the database"""
+        """
+        commit all changes to the database,
+        unless a transaction() block will do it
+        """
+        if not self.__session.info.get('hbnb.transaction'):
+            self.__invalidate()
+            self.__session.commit()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Turns every save() in the block into one commit when it exits,
+        or rolls the session back if the block raises.
+        Nested blocks join the outermost one.
+        """
+        info = self.__session.info
+        if info.get('hbnb.transaction'):
+            yield self
+            return
+        info['hbnb.transaction'] = True
+        try:
+            yield self
+        except BaseException:
+            info.pop('hbnb.transaction', None)
+            self.__session.rollback()
+            if self.__cache:
+                self.__cache.clear()
+            raise
+        info.pop('hbnb.transaction', None)
+        self.__invalidate()
         self.__session.commit()
 
+    def related(self, obj, name):
+        """
+        Returns the list of objects related to obj through its
+        SQLAlchemy relationship name, like related(user, "places")
+        """
+        self.__relation(type(obj), name)
+        return list(getattr(obj, name))
+
+    def nearby(self, lat, lon, radius_km):
+        """
+        Returns the Places within radius_km of (lat, lon), nearest
+        first: the database selects the bounding box of the circle,
+        and the exact distances are checked here
+        """
+        place = classes['Place']
+        min_lat, max_lat, spans = bounding_box(lat, lon, radius_km)
+        statement = select(place).where(
+            place.latitude.between(min_lat, max_lat),
+            or_(*[place.longitude.between(low, high)
+                  for low, high in spans]))
+        places = {obj.id: obj
+                  for obj in self.__session.execute(statement).scalars()
+                  if is_coordinate(obj.latitude, obj.longitude)}
+        points = [point(id, obj.latitude, obj.longitude)
+                  for id, obj in places.items()]
+        return [places[id] for distance, id
+                in sorted(distances(lat, lon, points))
+                if distance <= radius_km]
+
+    def nearest(self, lat, lon, k):
+        """
+        Returns the k Places nearest (lat, lon), nearest first,
+        through nearby() with a growing radius
+        """
+        radius = 50
+        while True:
+            found = self.nearby(lat, lon, radius)
+            if len(found) >= k or radius > pi * EARTH_RADIUS_KM:
+                return found[:k]
+            radius *= 2
+
+    def search(self, cls, text, limit=None):
+        """
+        Returns the objects of class cls whose text fields hold the
+        words of text, best first. The database selects the rows
+        where one of the words appears, even inside another word,
+        which are then ranked with BM25 like in FileStorage: as they
+        include every row holding a word as a whole, the number of
+        rows holding each word comes from them, and the number of
+        rows and their average length from __text_stats()
+        """
+        if isinstance(cls, str):
+            cls = classes[cls]
+        fields = TEXT_FIELDS.get(cls.__name__)
+        if not fields or inspect(cls, raiseerr=False) is None:
+            raise ValueError(f"{cls.__name__} has no text fields")
+        words = set(tokenize(text))
+        if not words:
+            return []
+        statement = select(cls).where(or_(*[
+            getattr(cls, field).ilike(f"%{_escape_like(word)}%",
+                                      escape='\\')
+            for field in fields for word in words]))
+        found = {obj.id: obj
+                 for obj in self.__session.execute(statement).scalars()}
+        if not found:
+            return []
+        count, average = self.__text_stats(cls, fields)
+        index = TextIndex()
+        for id, obj in found.items():
+            index.add(id, document(obj, fields))
+        return [found[id] for score, id in index.search(
+            text, limit, count, average)]
+
+    def __text_stats(self, cls, fields):
+        """
+        Returns the number of rows of cls with text and their average
+        number of words, in one COUNT query. The words of a text are
+        counted by its spaces
+        """
+        columns = [getattr(cls, field) for field in fields]
+        has_text = or_(*[column != '' for column in columns])
+        words = sum(case((column != '', func.length(column) - func.length(
+            func.replace(column, ' ', '')) + 1), else_=0)
+            for column in columns)
+        count, total = self.__session.execute(
+            select(func.count(), func.sum(words)).where(has_text)).one()
+        return count, (total or 0) / count if count else None
+
+    def iter(self, cls, batch_size=1000, after=None):
+        """
+        Yields the objects of class cls in id order, starting after
+        the id after. Each batch is one keyset query of batch_size
+        rows past the last id, streamed with yield_per, so a walk of a
+        whole table never holds more than one batch
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        if isinstance(cls, str):
+            cls = classes[cls]
+        if inspect(cls, raiseerr=False) is None:
+            raise ValueError(f"{cls.__name__} is not mapped")
+        while True:
+            statement = select(cls).order_by(cls.id).limit(batch_size)
+            if after is not None:
+                statement = statement.where(cls.id > after)
+            statement = statement.execution_options(yield_per=batch_size)
+            count = 0
+            for obj in self.__session.execute(statement).scalars():
+                count += 1
+                after = obj.id
+                yield obj
+            if count < batch_size:
+                return
+
+    def query(self, cls):
+        """Starts a query on the objects of class cls"""
+        return Query(self, cls)
+
+    def _execute(self, query):
+        """Compiles a query to one SELECT statement and runs it"""
+        statement = self.__select(query)
+        query.plan = 'sql: ' + ' '.join(str(statement).split())
+        return list(self.__session.execute(statement).scalars())
+
+    def _count(self, query):
+        """Compiles a query to one SELECT COUNT statement and runs it"""
+        statement = select(func.count()).select_from(
+            self.__select(query, ordered=False).subquery())
+        query.plan = 'sql: ' + ' '.join(str(statement).split())
+        return self.__session.execute(statement).scalar()
+
+    def __select(self, query, ordered=True):
+        """Returns the SELECT statement of a query, sorted if ordered"""
+        cls = query.cls
+        if isinstance(cls, str):
+            cls = classes[cls]
+        columns = inspect(cls).columns
+
+        def column(field):
+            """Returns the mapped column of field"""
+            if field not in columns:
+                raise ValueError(f"{cls.__name__} has no column {field}")
+            return getattr(cls, field)
+
+        statement = select(cls)
+        for field, lookup, value in query.filters:
+            if lookup == 'in':
+                statement = statement.where(column(field).in_(value))
+            else:
+                statement = statement.where(
+                    LOOKUPS[lookup](column(field), value))
+        for field, descending in query.ordering if ordered else ():
+            statement = statement.order_by(
+                column(field).desc() if descending else column(field))
+        if query.count_max is not None:
+            statement = statement.limit(query.count_max)
+        return statement
+
     def delete(self, obj=None):
         """delete obj if exists from db"""
         if obj:
             self.__session.delete(obj)
+            if self.__cache:
+                self.__cache.discard(type(obj).__name__, obj.id)
 
     def reload(self):
         """
@@ -81,6 +591,17 @@ class DBStorage:
         Base.metadata.create_all(self.__engine)
         session_factory = sessionmaker(bind=self.__engine,
                                        expire_on_commit=False)
-        Session = scoped_session(session_factory)
-        self.__session = Session()
+        self.__session = scoped_session(session_factory)
+
+    def migrate(self, dry_run=False):
+        """
+        Adds the tables and the declared indexes the database lacks,
+        returning the indexes added (see models.engine.migrate)
+        """
+        return add_missing_indexes(self.__engine, dry_run)
+
+    def close(self):
+        """Ends the session of the calling thread, returning its connection"""
+        if self.__session is not None:
+            self.__session.remove()
 
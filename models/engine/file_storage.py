@@ -1,55 +1,1114 @@
 #!/usr/bin/python3
 """This module defines a class to manage file storage for hbnb clone"""
+import atexit
 import json
+import os
+import threading
+import zlib
+from bisect import bisect_right
+from itertools import chain
+from contextlib import contextmanager
+from types import MappingProxyType
 import models
+from models.base_model import watch
+from models.compact import compact
+from models.engine.geo_index import GeoIndex
+from models.engine.query import Query
+from models.engine.range_index import RangeIndex
+from models.engine.serializers import serializers
+from models.engine.snapshot import Snapshot, write_snapshot
+from models.engine.text_index import TEXT_FIELDS, TextIndex, document
+
+
+def _relations(classes):
+    """
+    Returns ({class name: foreign key attributes},
+    {parent class name: {relation name: (class name, attribute)}})
+    for the models in classes. The foreign keys are the ForeignKey
+    columns of the mapped models, and the "<class>_id" string fields
+    of the others; a relation is named after the table of the class
+    holding the key, like "places", or its plural.
+    """
+    tables = {getattr(cls, '__tablename__', None): name
+              for name, cls in classes.items()}
+    fields = {}
+    relations = {}
+    for name, cls in classes.items():
+        table = getattr(cls, '__table__', None)
+        keys = []
+        if table is not None:
+            for column in table.columns:
+                for foreign_key in column.foreign_keys:
+                    parent = foreign_key.target_fullname.split('.')[0]
+                    keys.append((column.key, tables.get(parent)))
+        else:
+            for attr, value in vars(cls).items():
+                if attr.endswith('_id') and isinstance(value, str):
+                    keys.append((attr, attr[:-3].capitalize()))
+        relation = getattr(cls, '__tablename__', None) or \
+            name.lower() + 's'
+        for attr, parent in keys:
+            if parent in classes:
+                fields.setdefault(name, []).append(attr)
+                relations.setdefault(parent, {})[relation] = (name, attr)
+    return {name: tuple(attrs) for name, attrs in fields.items()}, relations
+
+
+class _Encoded(dict):
+    """Records already encoded by the serializer, by key"""
 
 
 class FileStorage:
-    """This class manages storage of hbnb models in JSON format"""
+    """This class manages storage of hbnb models in JSON format
+
+    __objects maps "<class name>.<id>" to every object in storage, and
+    __classes keeps the same objects bucketed by class name so that
+    all(cls) only touches the objects of that class.
+
+    In journal mode (HBNB_FILE_JOURNAL=1) save() appends one record per
+    object passed to new() or delete() since the last save to
+    "<file path>.log" instead of rewriting the whole file, and folds the
+    log back into the file once it grows past journal_max bytes
+    (HBNB_FILE_JOURNAL_MAX, 1 MiB by default).
+
+    In lazy mode (HBNB_FILE_LAZY=1) reload() only keeps the parsed
+    records in __pending, and an object is built the first time it is
+    reached through all(), all(cls) or get().
+
+    After reload(classes) in the single file layout __partial holds the
+    names of the classes read, and save() carries the records of the
+    other classes over from the file, so that they are not lost.
+
+    Inside a transaction() block save() only takes note, and the
+    storage is written once when the block exits.
+
+    With a write delay (HBNB_FILE_WRITE_DELAY, in seconds) save() only
+    wakes a background thread, which waits that long for more saves and
+    then writes once. flush() writes right away and close(), also run
+    at exit, stops the thread. The storage file is always replaced
+    atomically through a temporary file.
+
+    In sharded mode (HBNB_FILE_SHARDS) the objects are kept in
+    "<file path>.d/<shard>.json" files instead, one per class name
+    ("class") or one per hash bucket of the id (a number of shards).
+    save() rewrites only the shards holding changed objects, and a
+    shard is only read the first time an object it may hold is needed.
+
+    The file and the shards are written by a serializer from
+    models.engine.serializers (HBNB_FILE_FORMAT, "json" by default);
+    with another format the file name takes that format's extension.
+    The journal is always JSON lines.
+
+    In snapshot mode (HBNB_FILE_SNAPSHOT=<path>) the storage is read-only
+    and backed by a memory-mapped snapshot file (see
+    models.engine.snapshot): reload() only maps it, get() decodes the
+    one record it needs, all(cls) decodes that class, and save() raises
+    PermissionError.
+
+    With HBNB_FILE_SLOTS=1 the objects read from disk are built as the
+    compact, slot-based twins from models.compact.
+
+    __refs is a hash index of every foreign key in __ref_fields, like
+    City.state_id: for ("City", "state_id") it maps a state id to the
+    cities holding it, and every city key to its state id. It is kept
+    up to date by new(), delete(), loading and attribute updates, and
+    backs related(), like related(state, "cities"). __pending_refs
+    does the same for the records pending in lazy mode, so that
+    related() only builds the objects it returns.
+
+    With range indexes (HBNB_FILE_RANGES=1, or a comma separated list
+    of "<class>.<field>") __ranges keeps a RangeIndex, sorted by value,
+    for numeric fields like Place.price_by_night, which query() uses
+    for bounds and for order_by() with limit().
+
+    __geo is a GeoIndex of the Place coordinates for nearby() and
+    nearest(). It is built by the first of these calls and kept up to
+    date from then on.
+
+    __texts keeps a TextIndex per class of TEXT_FIELDS, like the
+    Place descriptions, for search(). Each is built by the first
+    search of its class and kept up to date the same way.
+    """
     __file_path = 'file.json'
     __objects = {}
+    __classes = {}
+    __indexed = None
+    __dirty = {}
+    __pending = {}
+    __undo = None
+    __deferred = False
+    __lock = threading.RLock()
+    __io_lock = threading.RLock()
+    __unloaded = set()
+    __partial = None
+    __mapped = None
+    __refs = {}
+    __pending_refs = {}
+    __ref_fields = {}
+    __relations = None
+    __ranges = {}
+    __range_fields = {}
+    RANGE_FIELDS = ('Place.price_by_night', 'Place.max_guest',
+                    'Place.number_rooms')
+    __geo = None
+    __texts = {}
+
+    def __init__(self, journal=None, journal_max=None, lazy=None,
+                 write_delay=None, shards=None, serializer=None,
+                 snapshot=None, slots=None, ranges=None):
+        """Sets up the storage, reading defaults from the environment"""
+        if journal is None:
+            journal = os.getenv('HBNB_FILE_JOURNAL') == '1'
+        if journal_max is None:
+            journal_max = int(os.getenv('HBNB_FILE_JOURNAL_MAX', 1 << 20))
+        if lazy is None:
+            lazy = os.getenv('HBNB_FILE_LAZY') == '1'
+        if write_delay is None and os.getenv('HBNB_FILE_WRITE_DELAY'):
+            write_delay = float(os.getenv('HBNB_FILE_WRITE_DELAY'))
+        if shards is None and os.getenv('HBNB_FILE_SHARDS'):
+            shards = os.getenv('HBNB_FILE_SHARDS')
+            shards = int(shards) if shards.isdigit() else shards
+        if shards is not None and shards != 'class' and \
+                not (isinstance(shards, int) and shards > 0):
+            raise ValueError("shards must be 'class' or a positive number")
+        if shards and journal:
+            raise ValueError("journal mode needs the single file layout")
+        if snapshot is None:
+            snapshot = os.getenv('HBNB_FILE_SNAPSHOT')
+        if snapshot and (shards or journal):
+            raise ValueError("snapshot mode is read-only and unsharded")
+        if serializer is None:
+            serializer = os.getenv('HBNB_FILE_FORMAT', 'json')
+        if isinstance(serializer, str):
+            serializer = serializers[serializer]
+        self.serializer = serializer
+        self.journal = journal
+        self.journal_max = journal_max
+        self.lazy = lazy
+        self.write_delay = write_delay
+        if slots is None:
+            slots = os.getenv('HBNB_FILE_SLOTS') == '1'
+        self.shards = shards
+        self.snapshot = snapshot
+        self.slots = slots
+        if ranges is None:
+            ranges = os.getenv('HBNB_FILE_RANGES', '')
+        if ranges in (True, '1'):
+            ranges = FileStorage.RANGE_FIELDS
+        elif isinstance(ranges, str):
+            ranges = [name for name in ranges.split(',') if name]
+        self.ranges = tuple(ranges or ())
+        for name in self.ranges:
+            cls_name, _, field = name.partition('.')
+            fields = FileStorage.__range_fields.setdefault(cls_name, set())
+            if field not in fields:
+                fields.add(field)
+                FileStorage.__indexed = None
+            watch(field, FileStorage.__moved)
+        self.__flusher = None
+        self.__flush_needed = False
+        self.__closing = False
+        self.__flush_cond = threading.Condition()
+        if FileStorage.__relations is None:
+            FileStorage.__ref_fields, FileStorage.__relations = \
+                _relations(models.classes)
+            FileStorage.__indexed = None
+        for names in FileStorage.__ref_fields.values():
+            for name in names:
+                watch(name, FileStorage.__moved)
+        watch('latitude', FileStorage.__moved)
+        watch('longitude', FileStorage.__moved)
+        for names in TEXT_FIELDS.values():
+            for name in names:
+                watch(name, FileStorage.__moved)
+
+    @staticmethod
+    def _class_name(cls):
+        """Returns the class name for a class object or a class name"""
+        return cls if isinstance(cls, str) else cls.__name__
+
+    def __buckets(self):
+        """
+        Returns the per-class buckets, rebuilding them first if
+        __objects was replaced or edited without new()/delete()
+        """
+        objects = FileStorage.__objects
+        buckets = FileStorage.__classes
+        if FileStorage.__indexed is not objects or \
+                sum(map(len, buckets.values())) != len(objects):
+            buckets.clear()
+            FileStorage.__refs = {}
+            FileStorage.__ranges = {}
+            FileStorage.__geo = None
+            FileStorage.__texts = {}
+            for key, obj in objects.items():
+                buckets.setdefault(key.split('.')[0], {})[key] = obj
+                self.__index(key, obj)
+            FileStorage.__indexed = objects
+        return buckets
+
+    @classmethod
+    def __index(cls, key, obj):
+        """Adds obj, stored under key, to the reverse indexes"""
+        cls_name = key.partition('.')[0]
+        for name in FileStorage.__ref_fields.get(cls_name, ()):
+            by_value, by_key = FileStorage.__refs.setdefault(
+                (cls_name, name), ({}, {}))
+            value = getattr(obj, name, None)
+            by_key[key] = value
+            by_value.setdefault(value, {})[key] = obj
+        for name in FileStorage.__range_fields.get(cls_name, ()):
+            FileStorage.__ranges.setdefault(
+                (cls_name, name), RangeIndex()).add(
+                    key, getattr(obj, name, None))
+        if cls_name == 'Place' and FileStorage.__geo is not None:
+            FileStorage.__geo.add(key, getattr(obj, 'latitude', None),
+                                  getattr(obj, 'longitude', None))
+        if cls_name in FileStorage.__texts:
+            FileStorage.__texts[cls_name].add(
+                key, document(obj, TEXT_FIELDS[cls_name]))
+
+    @classmethod
+    def __unindex(cls, key):
+        """Removes the object stored under key from the reverse indexes"""
+        cls_name = key.partition('.')[0]
+        for name in FileStorage.__ref_fields.get(cls_name, ()):
+            by_value, by_key = FileStorage.__refs.get(
+                (cls_name, name), ({}, {}))
+            if key not in by_key:
+                continue
+            value = by_key.pop(key)
+            holders = by_value[value]
+            del holders[key]
+            if not holders:
+                del by_value[value]
+        for name in FileStorage.__range_fields.get(cls_name, ()):
+            index = FileStorage.__ranges.get((cls_name, name))
+            if index is not None:
+                index.remove(key)
+        if cls_name == 'Place' and FileStorage.__geo is not None:
+            FileStorage.__geo.remove(key)
+        if cls_name in FileStorage.__texts:
+            FileStorage.__texts[cls_name].remove(key)
+
+    @classmethod
+    def __moved(cls, obj, name):
+        """Re-indexes obj after one of its indexed attributes changed"""
+        id = getattr(obj, 'id', None)
+        if not isinstance(id, str):
+            return
+        key = type(obj).__name__ + '.' + id
+        with FileStorage.__lock:
+            if FileStorage.__objects.get(key) is obj:
+                cls.__unindex(key)
+                cls.__index(key, obj)
+
+    def referencing(self, cls, name, value):
+        """
+        Returns a read-only view of the objects of class cls whose
+        attribute name is value, through the reverse index
+        """
+        cls_name = self._class_name(cls)
+        if name not in FileStorage.__ref_fields.get(cls_name, ()):
+            raise ValueError(f"{cls_name}.{name} is not indexed")
+        self.__need(cls_name)
+        keys = FileStorage.__pending_refs.get(
+            (cls_name, name), {}).pop(value, ())
+        pending = FileStorage.__pending.get(cls_name, {})
+        for key in keys:
+            val = pending.get(key)
+            if val is not None and val.get(name) == value:
+                self.__hydrate(cls_name, key)
+        self.__buckets()
+        by_value = FileStorage.__refs.get((cls_name, name), ({}, {}))[0]
+        return MappingProxyType(by_value.get(value, {}))
+
+    def related(self, obj, name):
+        """
+        Returns the list of objects related to obj through the
+        relation name, like related(user, "places")
+        """
+        cls_name = type(obj).__name__
+        try:
+            child, attr = FileStorage.__relations[cls_name][name]
+        except KeyError:
+            raise ValueError(f"{cls_name} has no relation {name}") from None
+        return list(self.referencing(child, attr, obj.id).values())
 
-    def all(self, cls=None):
+    def __places(self):
+        """Returns the Places and the GeoIndex, built on first use"""
+        places = self.all('Place')
+        if FileStorage.__geo is None:
+            geo = GeoIndex()
+            for key, obj in places.items():
+                geo.add(key, getattr(obj, 'latitude', None),
+                        getattr(obj, 'longitude', None))
+            FileStorage.__geo = geo
+        return places, FileStorage.__geo
+
+    def nearby(self, lat, lon, radius_km):
+        """Returns the Places within radius_km of (lat, lon), nearest first"""
+        places, geo = self.__places()
+        return [places[key] for distance, key
+                in geo.within(lat, lon, radius_km)]
+
+    def nearest(self, lat, lon, k):
+        """Returns the k Places nearest (lat, lon), nearest first"""
+        places, geo = self.__places()
+        return [places[key] for distance, key in geo.nearest(lat, lon, k)]
+
+    def search(self, cls, text, limit=None):
+        """
+        Returns the objects of class cls whose text fields match the
+        words of text, best BM25 score first
+        """
+        cls_name = self._class_name(cls)
+        if cls_name not in TEXT_FIELDS:
+            raise ValueError(f"{cls_name} has no text fields")
+        objects = self.all(cls_name)
+        index = FileStorage.__texts.get(cls_name)
+        if index is None:
+            index = TextIndex()
+            for key, obj in objects.items():
+                index.add(key, document(obj, TEXT_FIELDS[cls_name]))
+            FileStorage.__texts[cls_name] = index
+        return [objects[key] for score, key in index.search(text, limit)]
+
+    def query(self, cls):
+        """Starts a query on the objects of class cls"""
+        return Query(self, cls)
+
+    def _execute(self, query):
+        """
+        Runs a query through the index matching the fewest objects: a
+        foreign key index for an equality, or a range index for bounds
+        on a numeric field. Without one, order_by() on one indexed
+        field with limit() walks that range index in order, and any
+        other query scans the class.
+        """
+        objs, in_order = self.__candidates(query, ordered=True)
+        results = []
+        for obj in objs:
+            if query.matches(obj):
+                results.append(obj)
+                if in_order and len(results) == query.count_max:
+                    break
+        return query.arrange(results)
+
+    def _count(self, query):
+        """
+        Counts the objects matching a query through the same indexes
+        as _execute(), without building or sorting a result list
+        """
+        found = 0
+        for obj in self.__candidates(query)[0]:
+            if query.matches(obj):
+                found += 1
+                if found == query.count_max:
+                    break
+        return found
+
+    def __candidates(self, query, ordered=False):
+        """
+        Returns (objects that may match query, whether they come in
+        the order of the query), setting its plan; with ordered, a
+        range index may also be walked for order_by() with limit()
+        """
+        cls_name = self._class_name(query.cls)
+        objects = self.all(cls_name)
+        best = None
+        for field, lookup, value in query.filters:
+            if field not in FileStorage.__ref_fields.get(cls_name, ()) or \
+                    lookup not in ('exact', 'in'):
+                continue
+            by_value = FileStorage.__refs.get((cls_name, field), ({},))[0]
+            try:
+                values = [value] if lookup == 'exact' else \
+                    dict.fromkeys(value)
+                holders = [by_value.get(value, {}) for value in values]
+            except TypeError:
+                continue
+            size = sum(map(len, holders))
+            if best is None or size < best[0]:
+                best = (size, f"index {cls_name}.{field}", None,
+                        (obj for h in holders for obj in h.values()))
+        for field in {field for field, lookup, value in query.filters}:
+            index = FileStorage.__ranges.get((cls_name, field))
+            if index is None:
+                continue
+            bounds = index.bounds([(lookup, value) for name, lookup, value
+                                   in query.filters if name == field])
+            if bounds and (best is None or bounds[1] - bounds[0] < best[0]):
+                best = (bounds[1] - bounds[0], f"range {cls_name}.{field}",
+                        field, bounds)
+
+        ordered = ordered and len(query.ordering) == 1 and \
+            query.count_max is not None and \
+            (cls_name, query.ordering[0][0]) in FileStorage.__ranges
+        if best is None and ordered:
+            field, descending = query.ordering[0]
+            index = FileStorage.__ranges[(cls_name, field)]
+            best = (None, f"ordered {cls_name}.{field}", field,
+                    (0, len(index)))
+        if best is None:
+            query.plan = f"scan {cls_name}"
+            objs = objects.values()
+        else:
+            query.plan = best[1]
+            objs = best[3]
+        in_order = False
+        if best is not None and best[2] is not None:
+            index = FileStorage.__ranges[(cls_name, best[2])]
+            in_order = ordered and query.ordering[0][0] == best[2]
+            descending = in_order and query.ordering[0][1]
+            keys = index.between(*best[3], descending=descending)
+            if best[0] is None:
+                # non numeric values sort first, like None
+                others = list(index.others)
+                keys = chain(keys, others) if descending else \
+                    chain(others, keys)
+            objs = (objects[key] for key in keys)
+        return objs, in_order
+
+    def all(self, cls=None, load=None):
         """
         if cls is None
             Returns a dictionary of models currently in storage
         else
-            return a filtered dict
+            return a read-only view of the objects of class cls,
+            cls being either a class or a class name
+        load is there to match DBStorage.all(): related objects are
+        always in memory and found through the reverse indexes
         """
         if cls:
-            temp = {k: v for k, v in self.__objects.items()
-                    if type(v).__name__ == cls}
-            return temp
+            cls_name = self._class_name(cls)
+            self.__need(cls_name)
+            if cls_name in FileStorage.__pending:
+                self.__hydrate(cls_name)
+            bucket = self.__buckets().get(cls_name, {})
+            return MappingProxyType(bucket)
+        self.__need()
+        for cls_name in list(FileStorage.__pending):
+            self.__hydrate(cls_name)
         return (self.__objects)
 
+    def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None"""
+        cls_name = self._class_name(cls)
+        key = cls_name + '.' + id
+        self.__need(key=key)
+        obj = FileStorage.__objects.get(key)
+        if obj is None and key in FileStorage.__pending.get(cls_name, ()):
+            self.__hydrate(cls_name, key)
+            obj = FileStorage.__objects[key]
+        return obj
+
+    def count(self, cls=None):
+        """
+        Returns the number of objects of class cls, or of every
+        object, from the sizes of the buckets and pending records,
+        or for a class not read yet from a snapshot, from its count
+        in the snapshot and the keys changed in memory
+        """
+        mapped = FileStorage.__mapped
+        if self.snapshot and mapped is not None:
+            if cls is None:
+                names = mapped.classes().union(
+                    self.__buckets(), FileStorage.__pending)
+                return sum(self.count(name) for name in names)
+            cls_name = self._class_name(cls)
+            if cls_name in FileStorage.__unloaded:
+                prefix = cls_name + '.'
+                with FileStorage.__lock:
+                    added = sum(key not in mapped for key
+                                in self.__buckets().get(cls_name, ()))
+                    deleted = sum(
+                        obj is None and key.startswith(prefix) and
+                        key in mapped and self.__changed(key)
+                        for key, obj in FileStorage.__dirty.items())
+                return mapped.count(cls_name) + added - deleted
+        if cls is None:
+            self.__need()
+            return len(FileStorage.__objects) + \
+                sum(map(len, FileStorage.__pending.values()))
+        cls_name = self._class_name(cls)
+        self.__need(cls_name)
+        return len(self.__buckets().get(cls_name, ())) + \
+            len(FileStorage.__pending.get(cls_name, ()))
+
+    def iter(self, cls, batch_size=1000, after=None):
+        """
+        Yields the objects of class cls in id order, starting after
+        the id after, building at most batch_size pending objects at a
+        time; the id of the last object yielded resumes the walk
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        cls_name = self._class_name(cls)
+        self.__need(cls_name)
+        keys = chain(self.__buckets().get(cls_name, ()),
+                     FileStorage.__pending.get(cls_name, ()))
+        ids = sorted({key.partition('.')[2] for key in keys})
+        start = 0 if after is None else bisect_right(ids, after)
+        for i in range(start, len(ids), batch_size):
+            for id in ids[i:i + batch_size]:
+                obj = self.get(cls_name, id)
+                if obj is not None:
+                    yield obj
+
+    def __model(self, cls_name):
+        """Returns the class objects of cls_name are built with"""
+        cls = models.classes[cls_name]
+        return compact(cls) if self.slots else cls
+
+    def __hydrate(self, cls_name, key=None):
+        """
+        Builds the pending objects of class cls_name,
+        or only the one stored under key
+        """
+        pending = FileStorage.__pending[cls_name]
+        buckets = self.__buckets()
+        bucket = buckets.setdefault(cls_name, {})
+        keys = [key] if key else list(pending)
+        for key in keys:
+            obj = self.__model(cls_name).from_dict(pending.pop(key))
+            FileStorage.__objects[key] = obj
+            bucket[key] = obj
+            self.__index(key, obj)
+        if not pending:
+            del FileStorage.__pending[cls_name]
+
     def new(self, obj):
         """Adds new object to storage dictionary"""
-        FileStorage.__objects.update({obj.to_dict()['__class__'] + '.' + obj.id: obj})
+        cls_name = type(obj).__name__
+        key = cls_name + '.' + obj.id
+        with FileStorage.__lock:
+            buckets = self.__buckets()
+            self.__remember(key)
+            self.__unindex(key)
+            FileStorage.__objects[key] = obj
+            buckets.setdefault(cls_name, {})[key] = obj
+            self.__index(key, obj)
+            FileStorage.__dirty[key] = obj
+            self.__forget(cls_name, key)
+
+    def bulk_new(self, objects, batch_size=None):
+        """
+        Adds every object to storage, then saves once;
+        batch_size is only there to match DBStorage.bulk_new()
+        """
+        with FileStorage.__lock:
+            for obj in objects:
+                self.new(obj)
+        self.save()
 
     def save(self):
-        """Saves storage dictionary to file"""
-        with open(FileStorage.__file_path, 'w') as f:
+        """
+        Saves storage dictionary to file, or to the journal,
+        or asks the background flusher to do it
+        """
+        if FileStorage.__undo is not None:
+            FileStorage.__deferred = True
+            return
+        if self.snapshot:
+            raise PermissionError("snapshot storage is read-only")
+        if self.write_delay is None:
+            self.__write()
+            return
+        with self.__flush_cond:
+            self.__flush_needed = True
+            if self.__flusher is None:
+                self.__flusher = threading.Thread(
+                    target=self.__flush_loop, daemon=True)
+                self.__flusher.start()
+                atexit.register(self.close)
+            self.__flush_cond.notify()
+
+    def flush(self):
+        """Writes out a save() still waiting for the background flusher"""
+        with self.__flush_cond:
+            needed = self.__flush_needed
+            self.__flush_needed = False
+        if needed:
+            self.__write()
+
+    def close(self):
+        """Stops the background flusher after a last flush"""
+        flusher = self.__flusher
+        if flusher is not None:
+            with self.__flush_cond:
+                self.__closing = True
+                self.__flush_cond.notify()
+            flusher.join()
+            self.__flusher = None
+            self.__closing = False
+            atexit.unregister(self.close)
+        self.flush()
+
+    def __flush_loop(self):
+        """Background flusher: one write per burst of save() calls"""
+        cond = self.__flush_cond
+        while True:
+            with cond:
+                cond.wait_for(
+                    lambda: self.__flush_needed or self.__closing)
+                # let more saves of the same burst come in
+                cond.wait_for(lambda: self.__closing, self.write_delay)
+                if self.__closing:
+                    return
+            self.flush()
+
+    def compact(self):
+        """Folds the journal back into the storage file"""
+        if self.snapshot:
+            raise PermissionError("snapshot storage is read-only")
+        with FileStorage.__io_lock:
+            if self.shards:
+                self.__write_shards()
+            else:
+                self.__snapshot()
+
+    def __write(self):
+        """Writes the changes to the journal, the shards or the file"""
+        with FileStorage.__io_lock:
+            if self.shards:
+                with FileStorage.__lock:
+                    dirty = FileStorage.__dirty
+                    FileStorage.__dirty = {}
+                self.__write_shards(
+                    {self.__shard_of(key) for key in dirty}, dirty)
+                return
+            if not self.journal:
+                self.__snapshot()
+                return
+            self.__append()
+            if os.path.getsize(self.__log_path()) > self.journal_max:
+                self.__snapshot()
+
+    def __snapshot(self):
+        """Atomically rewrites the storage file and drops the journal"""
+        skipped = self.__skipped()
+        with FileStorage.__lock:
+            temp = {key: val for key, val in skipped.items()
+                    if not self.__changed(key)}
+            for pending in FileStorage.__pending.values():
+                temp.update(pending)
+            objects = dict(FileStorage.__objects)
+            FileStorage.__dirty = {}
+        self.__dump(self.__path(), self.__records_of(temp, objects))
+        try:
+            os.remove(self.__log_path())
+        except FileNotFoundError:
+            pass
+
+    def __skipped(self):
+        """
+        Returns {key: dict form} of the saved objects of the classes
+        a partial reload left out
+        """
+        loaded = FileStorage.__partial
+        if loaded is None:
+            return {}
+        skipped = {}
+        for key, val in self.__records():
+            if key.partition('.')[0] in loaded:
+                continue
+            if val is None:
+                skipped.pop(key, None)
+            else:
+                skipped[key] = val
+        return skipped
+
+    def __records_of(self, records, objects):
+        """
+        Returns records updated with the dict forms of objects, or,
+        when the serializer can write encoded records, records and
+        objects encoded, objects through their cached to_json()
+        """
+        if not hasattr(self.serializer, 'dump_encoded'):
+            for key, val in objects.items():
+                records[key] = val if isinstance(val, dict) else \
+                    val.to_dict()
+            return records
+        encode = self.serializer.encode
+        texts = {key: encode(val) for key, val in records.items()}
+        for key, val in objects.items():
+            texts[key] = encode(val) if isinstance(val, dict) else \
+                val.to_json(encode)
+        return _Encoded(texts)
+
+    def __path(self):
+        """Returns the path of the storage file for the serializer"""
+        path = FileStorage.__file_path
+        if path.endswith(self.serializer.extension):
+            return path
+        return os.path.splitext(path)[0] + self.serializer.extension
+
+    def __open(self, path, mode):
+        """Opens path in text or binary mode, as the serializer needs"""
+        return open(path, mode + ('b' if self.serializer.binary else ''))
+
+    def __dump(self, path, temp):
+        """Serializes temp to path through a temporary file"""
+        tmp_path = path + '.tmp'
+        try:
+            with self.__open(tmp_path, 'w') as f:
+                if isinstance(temp, _Encoded):
+                    self.serializer.dump_encoded(temp, f)
+                else:
+                    self.serializer.dump(temp, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def export_snapshot(self, path):
+        """Writes every object in storage to a snapshot file at path"""
+        self.__need()
+        with FileStorage.__lock:
             temp = {}
-            temp.update(FileStorage.__objects)
-            for key, val in temp.items():
-                temp[key] = val.to_dict()
-            json.dump(temp, f)
+            for pending in FileStorage.__pending.values():
+                temp.update(pending)
+            objects = dict(FileStorage.__objects)
+        for key, val in objects.items():
+            temp[key] = val.to_dict()
+        write_snapshot(path, temp)
+
+    def __by_class(self):
+        """Tells if the objects are split by class name"""
+        return self.shards == 'class' or bool(self.snapshot)
+
+    def __shard_of(self, key):
+        """Returns the name of the shard holding key"""
+        cls_name, _, id = key.partition('.')
+        if self.__by_class():
+            return cls_name
+        return str(zlib.crc32(id.encode()) % self.shards)
+
+    def __shard_path(self, shard):
+        """Returns the path of a shard file"""
+        return os.path.join(self.__path() + '.d',
+                            shard + self.serializer.extension)
+
+    def __shard_records(self, shard, classes=None):
+        """Yields (key, dict form) for the records of one shard"""
+        if self.snapshot:
+            if classes is None or shard in classes:
+                yield from FileStorage.__mapped.records(shard)
+            return
+        try:
+            with self.__open(self.__shard_path(shard), 'r') as f:
+                yield from self.serializer.load(f, classes)
+        except FileNotFoundError:
+            pass
+
+    def __need(self, cls_name=None, key=None):
+        """
+        Reads the shards not read yet that may hold key,
+        or objects of class cls_name, or any object
+        """
+        unloaded = FileStorage.__unloaded
+        if not unloaded:
+            return
+        if key and self.snapshot:
+            if key.partition('.')[0] in unloaded and \
+                    not self.__changed(key):
+                val = FileStorage.__mapped.get(key)
+                if val is not None:
+                    self.__load(key, val, self.__buckets())
+            return
+        if key:
+            shards = {self.__shard_of(key)}
+        elif cls_name and self.__by_class():
+            shards = {cls_name}
+        else:
+            shards = set(unloaded)
+        self.__read_shards(shards & unloaded)
+
+    def __changed(self, key):
+        """Tells if key was set or deleted in memory"""
+        return key in FileStorage.__objects or \
+            (key in FileStorage.__dirty and FileStorage.__dirty[key] is None)
+
+    def __read_shards(self, shards, classes=None, deleted=()):
+        """
+        Loads the records of some shards, keeping the objects that
+        were changed in memory since, or are in deleted. Without a
+        classes filter the shards are marked as read.
+        """
+        buckets = self.__buckets()
+        for shard in shards:
+            for key, val in self.__shard_records(shard, classes):
+                if self.__changed(key) or key in deleted:
+                    continue
+                self.__load(key, val, buckets)
+            if classes is None:
+                FileStorage.__unloaded.discard(shard)
+
+    def __write_shards(self, shards=None, dirty=None):
+        """
+        Rewrites the given shards, holding the keys of dirty, which
+        the caller took out of __dirty, or all of them
+        """
+        if shards is None:
+            self.__need()
+        else:
+            self.__read_shards(shards & FileStorage.__unloaded,
+                               deleted={key for key, obj in dirty.items()
+                                        if obj is None})
+        with FileStorage.__lock:
+            contents = {shard: {} for shard in shards or ()}
+            if self.shards == 'class' and shards is not None:
+                buckets = self.__buckets()
+                for shard in shards:
+                    contents[shard].update(
+                        FileStorage.__pending.get(shard, {}))
+                    contents[shard].update(buckets.get(shard, {}))
+            else:
+                for pending in FileStorage.__pending.values():
+                    for key, val in pending.items():
+                        shard = self.__shard_of(key)
+                        if shards is None or shard in shards:
+                            contents.setdefault(shard, {})[key] = val
+                for key, val in FileStorage.__objects.items():
+                    shard = self.__shard_of(key)
+                    if shards is None or shard in shards:
+                        contents.setdefault(shard, {})[key] = val
+            if shards is None:
+                FileStorage.__dirty = {}
+        os.makedirs(self.__path() + '.d', exist_ok=True)
+        for shard, temp in contents.items():
+            if not temp:
+                try:
+                    os.remove(self.__shard_path(shard))
+                except FileNotFoundError:
+                    pass
+                continue
+            self.__dump(self.__shard_path(shard),
+                        self.__records_of({}, temp))
+
+    def __log_path(self):
+        """Returns the path of the journal file"""
+        return self.__path() + '.log'
+
+    def __append(self):
+        """Appends a record for every changed object to the journal"""
+        with FileStorage.__lock:
+            dirty = FileStorage.__dirty
+            FileStorage.__dirty = {}
+        with open(self.__log_path(), 'a') as f:
+            for key, obj in dirty.items():
+                if obj is None:
+                    record = {'op': 'del', 'key': key}
+                else:
+                    record = {'op': 'set', 'key': key,
+                              'value': obj.to_dict()}
+                f.write(json.dumps(record) + '\n')
 
     def delete(self, obj=None):
         """deletes obj from __object private class attr"""
         if obj:
-            className = obj.__str__().split("[")[1].split("]")[0]
-            classId = obj.__str__().split("(")[1].split(")")[0]
-            del FileStorage.__objects["{}.{}".format(className, classId)]
+            cls_name = type(obj).__name__
+            key = cls_name + '.' + obj.id
+            with FileStorage.__lock:
+                buckets = self.__buckets()
+                self.__remember(key)
+                del FileStorage.__objects[key]
+                buckets[cls_name].pop(key, None)
+                self.__unindex(key)
+                FileStorage.__dirty[key] = None
+
+    def __forget(self, cls_name, key):
+        """Drops the pending record stored under key, if any"""
+        pending = FileStorage.__pending.get(cls_name)
+        if pending and pending.pop(key, None) is not None and not pending:
+            del FileStorage.__pending[cls_name]
+
+    def __load(self, key, val, buckets):
+        """
+        Builds the object stored under key from its dict form,
+        or keeps the dict for later in lazy mode
+        """
+        cls_name = val['__class__']
+        self.__unindex(key)
+        if self.lazy:
+            if FileStorage.__objects.pop(key, None) is not None:
+                buckets.get(cls_name, {}).pop(key, None)
+            self.__pend(cls_name, key, val)
+            return
+        obj = self.__model(cls_name).from_dict(val)
+        FileStorage.__objects[key] = obj
+        buckets.setdefault(cls_name, {})[key] = obj
+        self.__index(key, obj)
+        self.__forget(cls_name, key)
+
+    @classmethod
+    def __pend(cls, cls_name, key, val):
+        """
+        Keeps the record val pending under key, noting its foreign
+        keys in __pending_refs; the entries of records built or
+        dropped since are only weeded out by referencing()
+        """
+        FileStorage.__pending.setdefault(cls_name, {})[key] = val
+        for name in FileStorage.__ref_fields.get(cls_name, ()):
+            FileStorage.__pending_refs.setdefault(
+                (cls_name, name), {}).setdefault(
+                    val.get(name), {})[key] = None
 
-    def reload(self):
-        """Loads storage dictionary from file"""
+    def __unload(self, key, buckets):
+        """Drops the object or pending record stored under key"""
+        cls_name = key.split('.')[0]
+        FileStorage.__objects.pop(key, None)
+        buckets.get(cls_name, {}).pop(key, None)
+        self.__unindex(key)
+        self.__forget(cls_name, key)
 
+    def __records(self, classes=None):
+        """
+        Yields (key, dict form) for the saved objects of the given
+        class names, the file first and then the journal, where a
+        deleted object comes up as (key, None)
+        """
+        if self.shards or self.snapshot:
+            for shard in self.__shard_names():
+                if not self.__by_class() or classes is None or \
+                        shard in classes:
+                    yield from self.__shard_records(shard, classes)
+            return
         try:
-            temp = {}
-            with open(FileStorage.__file_path, 'r') as f:
-                temp = json.load(f)
-                for key, val in temp.items():
-                    self.__objects[key] = models.classes[val['__class__']](**val)
+            with self.__open(self.__path(), 'r') as f:
+                yield from self.serializer.load(f, classes)
         except FileNotFoundError:
             pass
+        try:
+            f = open(self.__log_path(), 'r')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # torn write at the end of the log
+                    break
+                key = record['key']
+                if classes is None or key.split('.')[0] in classes:
+                    yield key, record.get('value')
+
+    def __shard_names(self):
+        """Returns the names of the shards on disk"""
+        if self.snapshot:
+            return FileStorage.__mapped.classes()
+        try:
+            names = os.listdir(self.__path() + '.d')
+        except FileNotFoundError:
+            return set()
+        ext = self.serializer.extension
+        return {name[:-len(ext)] for name in names if name.endswith(ext)}
+
+    def reload(self, classes=None):
+        """
+        Loads storage dictionary from file, then replays the journal
+
+        The file is parsed one record at a time. If classes (class
+        objects or class names) is set, only those classes are loaded.
+        In sharded mode the shards are read when first needed instead,
+        except the shards of classes.
+        """
+        if classes is not None:
+            classes = {self._class_name(cls) for cls in classes}
+        if self.snapshot:
+            if FileStorage.__mapped is not None:
+                FileStorage.__mapped.close()
+            FileStorage.__mapped = Snapshot(self.snapshot)
+        if self.shards or self.snapshot:
+            FileStorage.__unloaded = self.__shard_names()
+            if classes is not None and self.__by_class():
+                self.__read_shards(classes & FileStorage.__unloaded)
+            elif classes is not None:
+                self.__read_shards(set(FileStorage.__unloaded), classes)
+            return
+        if classes is None:
+            FileStorage.__partial = None
+        else:
+            FileStorage.__partial = (FileStorage.__partial or set()) | \
+                classes
+        buckets = self.__buckets()
+        for key, val in self.__records(classes):
+            if val is None:
+                self.__unload(key, buckets)
+            else:
+                self.__load(key, val, buckets)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Defers save() until the block exits, then saves once
+
+        If the block raises, every object passed to new() or delete()
+        inside it is put back the way it was last saved; objects
+        created in the block are dropped. Nested blocks join the
+        outermost one.
+        """
+        if FileStorage.__undo is not None:
+            yield self
+            return
+        # a rollback reads back the last save, which must be on disk
+        self.flush()
+        dirty = dict(FileStorage.__dirty)
+        FileStorage.__undo = {}
+        FileStorage.__deferred = False
+        try:
+            yield self
+        except BaseException:
+            undo = FileStorage.__undo
+            FileStorage.__undo = None
+            self.__rollback(undo)
+            FileStorage.__dirty = dirty
+            raise
+        FileStorage.__undo = None
+        if FileStorage.__deferred:
+            self.save()
+
+    def __rollback(self, undo):
+        """Puts back the objects recorded by new() and delete()"""
+        buckets = self.__buckets()
+        changed = {key.split('.')[0] for key, prev in undo.items()
+                   if prev is not None and not isinstance(prev, dict)}
+        saved = {}
+        if changed:
+            for key, val in self.__records(changed):
+                if key in undo:
+                    saved[key] = val
+        for key, prev in undo.items():
+            self.__unload(key, buckets)
+            cls_name = key.split('.')[0]
+            if prev is None:
+                continue
+            if isinstance(prev, dict):
+                self.__pend(cls_name, key, prev)
+                continue
+            if saved.get(key) and hasattr(prev, '_copy_from'):
+                prev._copy_from(type(prev)(**saved[key]))
+            elif saved.get(key):
+                fresh = models.classes[cls_name](**saved[key]).__dict__
+                fresh.pop('_sa_instance_state', None)
+                state = prev.__dict__.get('_sa_instance_state')
+                prev.__dict__.clear()
+                prev.__dict__.update(fresh)
+                if state is not None:
+                    prev.__dict__['_sa_instance_state'] = state
+                prev._uncache()
+            FileStorage.__objects[key] = prev
+            buckets.setdefault(cls_name, {})[key] = prev
+            self.__index(key, prev)
+
+    def __remember(self, key):
+        """Records what key held before the running transaction"""
+        undo = FileStorage.__undo
+        if undo is None or key in undo:
+            return
+        prev = FileStorage.__objects.get(key)
+        if prev is None:
+            prev = FileStorage.__pending.get(key.split('.')[0], {}).get(key)
+        undo[key] = prev
@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+"""
+This module defines a grid index of points on the Earth
+
+GeoIndex puts every (latitude, longitude) in a cell of cell_size
+degrees. A radius search only reads the cells of the bounding box of
+the circle, then computes the great-circle distances of the points in
+those cells in one pass over their precomputed radians and cosines.
+bounding_box() is also what DBStorage filters on in SQL.
+"""
+from math import asin, cos, degrees, floor, radians, sin, sqrt, pi
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def is_coordinate(lat, lon):
+    """Tells if (lat, lon) is a valid point, in degrees"""
+    for value in (lat, lon):
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+    return -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Returns (min lat, max lat, [(min lon, max lon), ...]) covering
+    every point within radius_km of (lat, lon); the longitude range
+    is split in two when it crosses the antimeridian
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    min_lat = lat - degrees(angle)
+    max_lat = lat + degrees(angle)
+    if min_lat <= -90 or max_lat >= 90 or sin(angle) >= cos(radians(lat)):
+        return max(min_lat, -90), min(max_lat, 90), [(-180, 180)]
+    spread = degrees(asin(sin(angle) / cos(radians(lat))))
+    low, high = lon - spread, lon + spread
+    if low < -180:
+        return min_lat, max_lat, [(low + 360, 180), (-180, high)]
+    if high > 180:
+        return min_lat, max_lat, [(low, 180), (-180, high - 360)]
+    return min_lat, max_lat, [(low, high)]
+
+
+def point(key, lat, lon):
+    """Returns the (key, radians, radians, cosine) form of a point"""
+    lat_rad = radians(lat)
+    return key, lat_rad, radians(lon), cos(lat_rad)
+
+
+def distances(lat, lon, points):
+    """
+    Returns [(distance in km, key)] from (lat, lon) to points, a list
+    of (key, latitude in radians, longitude in radians, cos(latitude))
+    """
+    lat, lon = radians(lat), radians(lon)
+    cos_lat = cos(lat)
+    scale = 2 * EARTH_RADIUS_KM
+    return [(scale * asin(min(1.0, sqrt(
+        sin((p_lat - lat) / 2) ** 2 +
+        cos_lat * p_cos * sin((p_lon - lon) / 2) ** 2))), key)
+        for key, p_lat, p_lon, p_cos in points]
+
+
+class GeoIndex:
+    """Keys of points bucketed in a grid of cell_size degree cells"""
+
+    def __init__(self, cell_size=0.5):
+        """Starts an empty index"""
+        self.cell_size = cell_size
+        self.rows = int(180 / cell_size)
+        self.cols = int(360 / cell_size)
+        self.cells = {}
+        self.of = {}
+
+    def __len__(self):
+        """Returns the number of points"""
+        return len(self.of)
+
+    def __row(self, lat):
+        """Returns the row of a latitude"""
+        return min(int(floor((lat + 90) / self.cell_size)), self.rows - 1)
+
+    def __col(self, lon):
+        """Returns the column of a longitude, unwrapped"""
+        return int(floor((lon + 180) / self.cell_size))
+
+    def add(self, key, lat, lon):
+        """Adds key at (lat, lon), replacing where key was before"""
+        self.remove(key)
+        if not is_coordinate(lat, lon):
+            return
+        cell = (self.__row(lat), self.__col(lon) % self.cols)
+        self.cells.setdefault(cell, {})[key] = point(key, lat, lon)
+        self.of[key] = cell
+
+    def remove(self, key):
+        """Removes key, if it is in the index"""
+        cell = self.of.pop(key, None)
+        if cell is not None:
+            points = self.cells[cell]
+            del points[key]
+            if not points:
+                del self.cells[cell]
+
+    def within(self, lat, lon, radius_km):
+        """Returns [(distance, key)] of the points within radius_km"""
+        min_lat, max_lat, spans = bounding_box(lat, lon, radius_km)
+        cols = set()
+        for low, high in spans:
+            first, last = self.__col(low), self.__col(high)
+            if last - first + 1 >= self.cols:
+                cols = range(self.cols)
+                break
+            cols.update(col % self.cols for col in range(first, last + 1))
+        points = []
+        for row in range(self.__row(min_lat), self.__row(max_lat) + 1):
+            for col in cols:
+                points.extend(self.cells.get((row, col), {}).values())
+        found = [(distance, key) for distance, key
+                 in distances(lat, lon, points) if distance <= radius_km]
+        found.sort()
+        return found
+
+    def nearest(self, lat, lon, k):
+        """Returns [(distance, key)] of the k points nearest (lat, lon)"""
+        radius = self.cell_size * pi / 180 * EARTH_RADIUS_KM
+        while True:
+            found = self.within(lat, lon, radius)
+            if len(found) >= k or len(found) == len(self.of) or \
+                    radius > pi * EARTH_RADIUS_KM:
+                return found[:k]
+            radius *= 2
@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+"""
+This module reads a JSON object of records, like file.json,
+one top-level record at a time
+"""
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_records(f, classes=None, chunk_size=1 << 16):
+    """
+    Yields (key, value) for every member of the JSON object in the
+    text file f, keeping at most one record and one chunk of text in
+    memory. If classes is set, only keys "<class name>.<id>" whose
+    class name is in classes are yielded.
+
+    Raises ValueError (json.JSONDecodeError) on malformed input,
+    an empty file included.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def more():
+        """Reads the next chunk, dropping the text already parsed"""
+        nonlocal buf, pos, eof
+        chunk = f.read(max(chunk_size, len(buf) - pos))
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def peek():
+        """Skips whitespace and returns the next character, if any"""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                return buf[pos] if pos < len(buf) else ''
+            more()
+
+    def expect(chars):
+        """Consumes the next character, which must be one of chars"""
+        nonlocal pos
+        char = peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(
+                "Expecting one of {!r}".format(chars), buf, pos)
+        pos += 1
+        return char
+
+    def value():
+        """Decodes the next JSON value, reading more text as needed"""
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                val, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more()
+                continue
+            if end == len(buf) and not eof:
+                # a number may go on in the next chunk
+                more()
+                continue
+            pos = end
+            return val
+
+    expect('{')
+    if peek() == '}':
+        return
+    while True:
+        key = value()
+        if not isinstance(key, str):
+            raise json.JSONDecodeError("Expecting property name", buf, pos)
+        expect(':')
+        val = value()
+        if classes is None or key.partition('.')[0] in classes:
+            yield key, val
+        if expect(',}') == '}':
+            return
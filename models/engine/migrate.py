@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+"""
+This module brings the indexes of an existing database up to date
+
+Base.metadata.create_all() creates the tables that are missing, with
+their indexes, but leaves the tables that exist alone. A database
+created before an index was declared on a model, like the one on
+places.price_by_night, is only given it by add_missing_indexes(). An
+index is missing when the table has none by that name and none on the
+same columns in the same order.
+
+Usage: python3 -m models.engine.migrate [--dry-run] [database url]
+adds the missing indexes to the database of url, or to the one of the
+HBNB_DB_URL or HBNB_MYSQL_* variables, printing their names.
+"""
+import sys
+from sqlalchemy import inspect
+from models.base_model import Base
+
+
+def missing_indexes(engine):
+    """Returns the declared indexes the tables of engine lack"""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = inspector.get_indexes(table.name)
+        names = {index['name'] for index in existing}
+        columns = {tuple(index['column_names']) for index in existing}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name in names or \
+                    tuple(column.name for column in index.columns) in columns:
+                continue
+            missing.append(index)
+    return missing
+
+
+def add_missing_indexes(engine, dry_run=False):
+    """
+    Creates the missing tables, then the indexes the existing ones
+    lack, and returns the indexes added, or only found with dry_run
+    """
+    if not dry_run:
+        Base.metadata.create_all(engine)
+    missing = missing_indexes(engine)
+    if not dry_run:
+        for index in missing:
+            index.create(bind=engine)
+    return missing
+
+
+if __name__ == '__main__':
+    from models.engine.db_storage import DBStorage
+    args = sys.argv[1:]
+    dry_run = '--dry-run' in args
+    args = [arg for arg in args if arg != '--dry-run']
+    if len(args) > 1:
+        print("Usage: {} [--dry-run] [database url]".format(sys.argv[0]))
+        sys.exit(1)
+    storage = DBStorage(args[0] if args else None)
+    for index in storage.migrate(dry_run):
+        print("{} {} on {}({})".format(
+            'missing' if dry_run else 'added', index.name, index.table.name,
+            ', '.join(column.name for column in index.columns)))
@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""
+This module defines the connection pool of DBStorage and its metrics
+
+MeteredQueuePool is SQLAlchemy's QueuePool timing every checkout: the
+wait for a connection from the queue (or for a new one to be opened),
+and the whole checkout latency, which also counts the pre-ping when
+liveness checks are pessimistic. The latencies are counted in the
+buckets of a histogram in PoolMetrics.
+"""
+import threading
+import time
+from sqlalchemy.pool import QueuePool
+
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0,
+           float('inf'))
+
+
+class PoolMetrics:
+    """Counters and a latency histogram of the checkouts of a pool"""
+
+    def __init__(self):
+        """Starts with no checkout"""
+        self.__lock = threading.Lock()
+        self.checkouts = 0
+        self.wait = 0.0
+        self.wait_max = 0.0
+        self.latency = 0.0
+        self.latency_max = 0.0
+        self.counts = [0] * len(BUCKETS)
+
+    def waited(self, seconds):
+        """Records the seconds a checkout waited for a connection"""
+        with self.__lock:
+            self.wait += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def checked_out(self, seconds):
+        """Records the latency of a checkout, in seconds"""
+        with self.__lock:
+            self.checkouts += 1
+            self.latency += seconds
+            self.latency_max = max(self.latency_max, seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def snapshot(self):
+        """Returns the metrics as a dictionary"""
+        with self.__lock:
+            return {
+                'checkouts': self.checkouts,
+                'wait_seconds': self.wait,
+                'wait_max': self.wait_max,
+                'latency_seconds': self.latency,
+                'latency_max': self.latency_max,
+                'latency_histogram': list(zip(BUCKETS, self.counts)),
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    """A QueuePool recording its checkouts in self.metrics"""
+
+    def __init__(self, *args, **kwargs):
+        """Creates the pool with empty metrics"""
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        """Takes a connection from the queue, timing the wait"""
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.metrics.waited(time.perf_counter() - start)
+
+    def connect(self):
+        """Checks a connection out, timing the whole checkout"""
+        start = time.perf_counter()
+        connection = super().connect()
+        self.metrics.checked_out(time.perf_counter() - start)
+        return connection
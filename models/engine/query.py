@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""
+This module defines the query builder shared by both storage engines
+
+storage.query(Place).filter(city_id=id, price_by_night__lt=200)
+    .order_by('-price_by_night').limit(10).all()
+
+A filter keyword is a field name, optionally followed by "__" and one
+of the lookups in LOOKUPS ("exact" when there is none). order_by()
+takes field names, with a leading "-" for descending order. The
+engine runs the query and sets its plan to the path it took, like
+"index Place.city_id", "scan Place" or "sql: SELECT ...". As in SQL,
+a field that is None only matches an "exact" lookup of None.
+"""
+import operator
+
+LOOKUPS = {
+    'exact': operator.eq,
+    'ne': operator.ne,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'in': lambda value, values: value in values,
+}
+
+
+class Query:
+    """A query on the objects of one class of a storage engine"""
+
+    def __init__(self, storage, cls):
+        """Starts a query of class cls (a class or a class name)"""
+        self.storage = storage
+        self.cls = cls
+        self.filters = []
+        self.ordering = []
+        self.count_max = None
+        self.plan = None
+
+    def __copy(self):
+        """Returns a copy of the query, to be refined"""
+        query = Query(self.storage, self.cls)
+        query.filters = list(self.filters)
+        query.ordering = list(self.ordering)
+        query.count_max = self.count_max
+        return query
+
+    def filter(self, **conditions):
+        """Returns the query narrowed to the objects matching conditions"""
+        query = self.__copy()
+        for key, value in conditions.items():
+            field, _, lookup = key.partition('__')
+            lookup = lookup or 'exact'
+            if lookup not in LOOKUPS:
+                raise ValueError(f"unknown lookup {lookup} in {key}")
+            query.filters.append((field, lookup, value))
+        return query
+
+    def order_by(self, *fields):
+        """Returns the query sorted by fields ("-field" for descending)"""
+        query = self.__copy()
+        for field in fields:
+            query.ordering.append((field.lstrip('-'),
+                                   field.startswith('-')))
+        return query
+
+    def limit(self, count):
+        """Returns the query cut to its first count objects"""
+        query = self.__copy()
+        query.count_max = count
+        return query
+
+    def all(self):
+        """Runs the query and returns the list of matching objects"""
+        return self.storage._execute(self)
+
+    def __iter__(self):
+        """Iterates over the matching objects"""
+        return iter(self.all())
+
+    def first(self):
+        """Returns the first matching object, or None"""
+        query = self.limit(1)
+        results = query.all()
+        self.plan = query.plan
+        return results[0] if results else None
+
+    def count(self):
+        """
+        Returns the number of matching objects, counted by the engine
+        without building them when it can
+        """
+        return self.storage._count(self)
+
+    def explain(self):
+        """Runs the query and returns the path the engine took"""
+        self.all()
+        return self.plan
+
+    def matches(self, obj):
+        """Tells if obj passes every filter"""
+        for field, lookup, value in self.filters:
+            current = getattr(obj, field, None)
+            if current is None and lookup != 'exact':
+                return False
+            try:
+                if not LOOKUPS[lookup](current, value):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def arrange(self, objs):
+        """Sorts and cuts a list of matching objects"""
+        for field, descending in reversed(self.ordering):
+            objs.sort(key=lambda obj: _sort_key(getattr(obj, field, None)),
+                      reverse=descending)
+        if self.count_max is not None:
+            objs = objs[:self.count_max]
+        return objs
+
+
+def _sort_key(value):
+    """Sorts None before every other value, as MySQL and SQLite do"""
+    return (value is not None, value if value is not None else 0)
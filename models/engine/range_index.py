@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+"""
+This module defines a sorted index on one numeric attribute
+
+The keys are kept in two parallel lists sorted by (value, key), so a
+range of values is found with bisect in O(log n) and its keys are
+read in order. Keys whose value is not a number (None, or a string
+set by hand) are kept apart in others.
+"""
+from bisect import bisect_left, bisect_right
+
+
+def is_number(value):
+    """Tells if value can be kept in a RangeIndex"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class RangeIndex:
+    """Keys sorted by the numeric value of one attribute"""
+
+    def __init__(self):
+        """Starts an empty index"""
+        self.values = []
+        self.keys = []
+        self.of = {}
+        self.others = {}
+
+    def __len__(self):
+        """Returns the number of keys with a numeric value"""
+        return len(self.values)
+
+    def __position(self, key, value):
+        """Returns where (value, key) is or would be in the lists"""
+        low = bisect_left(self.values, value)
+        high = bisect_right(self.values, value, low)
+        return bisect_left(self.keys, key, low, high)
+
+    def add(self, key, value):
+        """Adds key with its value, replacing what key had before"""
+        self.remove(key)
+        self.of[key] = value
+        if not is_number(value):
+            self.others[key] = None
+            return
+        i = self.__position(key, value)
+        self.values.insert(i, value)
+        self.keys.insert(i, key)
+
+    def remove(self, key):
+        """Removes key, if it is in the index"""
+        if key not in self.of:
+            return
+        value = self.of.pop(key)
+        if key in self.others:
+            del self.others[key]
+            return
+        i = self.__position(key, value)
+        del self.values[i]
+        del self.keys[i]
+
+    def bounds(self, filters):
+        """
+        Returns (low, high), the positions of the keys passing every
+        (lookup, value) filter, or None when no filter can use the index
+        """
+        low, high = 0, len(self.values)
+        usable = False
+        for lookup, value in filters:
+            if not is_number(value):
+                continue
+            if lookup in ('gt', 'gte', 'exact'):
+                find = bisect_right if lookup == 'gt' else bisect_left
+                low = max(low, find(self.values, value))
+                usable = True
+            if lookup in ('lt', 'lte', 'exact'):
+                find = bisect_left if lookup == 'lt' else bisect_right
+                high = min(high, find(self.values, value))
+                usable = True
+        if not usable:
+            return None
+        return low, max(low, high)
+
+    def between(self, low=0, high=None, descending=False):
+        """Yields the keys from position low to high, in order"""
+        if high is None:
+            high = len(self.keys)
+        positions = range(low, high)
+        for i in reversed(positions) if descending else positions:
+            yield self.keys[i]
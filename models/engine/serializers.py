@@ -0,0 +1,262 @@
+#!/usr/bin/python3
+"""
+This module defines the formats FileStorage can save its objects in
+
+A serializer writes a dict of "<class name>.<id>" -> record with
+dump(records, f) and reads it back one record at a time with
+load(f, classes=None), on a file opened in text mode, or in binary
+mode when its binary attribute is True. Records are the dicts built
+by to_dict(), where created_at and updated_at may also be datetimes.
+
+Usage: python3 -m models.engine.serializers <source file> <destination>
+converts a storage file between the JSON and the binary formats.
+"""
+import json
+import struct
+import sys
+from datetime import datetime, timedelta
+from models.engine.json_stream import iter_records
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def _default(value):
+    """Encodes the datetimes json can not encode by itself"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%dT%H:%M:%S.%f')
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class JSONSerializer:
+    """The historical file.json format: one JSON object"""
+    name = 'json'
+    extension = '.json'
+    binary = False
+
+    def dump(self, records, f):
+        """Writes records to f as one JSON object"""
+        json.dump(records, f, default=_default)
+
+    def encode(self, record):
+        """Returns the JSON text of one record"""
+        return json.dumps(record, default=_default)
+
+    def dump_encoded(self, texts, f):
+        """
+        Writes records to f as one JSON object, from texts mapping
+        each key to the JSON text of its record, made by encode()
+        """
+        separator = '{'
+        for key, text in texts.items():
+            f.write(separator + json.dumps(key) + ': ' + text)
+            separator = ', '
+        f.write('}' if separator == ', ' else '{}')
+
+    def load(self, f, classes=None):
+        """Yields (key, record) from f, one record at a time"""
+        return iter_records(f, classes)
+
+
+class BinarySerializer:
+    """
+    A compact binary format
+
+    The file starts with MAGIC, followed by frames of a one byte tag, a
+    payload length and the payload. A schema frame ('S') gives a schema
+    number, a class name and field names, once per class and set of
+    fields; a record frame ('R') gives a schema number, the key and one
+    typed value per field of the schema: a type byte (0 None, 1 str,
+    2 int, 3 float, 4 True, 5 False, 6 datetime, 7 JSON) and the value.
+    Datetimes are stored as microseconds since the epoch, and values
+    with no type of their own (lists, dicts, big numbers) as JSON text.
+    """
+    name = 'binary'
+    extension = '.bin'
+    binary = True
+    MAGIC = b'HBNB\x01'
+
+    _frame = struct.Struct('<cI')
+    _u32 = struct.Struct('<I')
+    _u16 = struct.Struct('<H')
+    _i64 = struct.Struct('<q')
+    _f64 = struct.Struct('<d')
+
+    def _str(self, value):
+        """Encodes a length prefixed UTF-8 string"""
+        data = value.encode()
+        return self._u32.pack(len(data)) + data
+
+    def _value(self, key, value):
+        """Encodes one typed value"""
+        if value is None:
+            return b'\x00'
+        if value is True:
+            return b'\x04'
+        if value is False:
+            return b'\x05'
+        if isinstance(value, str):
+            if key in ('created_at', 'updated_at'):
+                value = datetime.fromisoformat(value)
+            else:
+                return b'\x01' + self._str(value)
+        if isinstance(value, datetime):
+            return b'\x06' + self._i64.pack((value - EPOCH) // MICROSECOND)
+        if isinstance(value, int) and -1 << 63 <= value < 1 << 63:
+            return b'\x02' + self._i64.pack(value)
+        if isinstance(value, float):
+            return b'\x03' + self._f64.pack(value)
+        return b'\x07' + self._str(json.dumps(value, default=_default))
+
+    def encode_schema(self, schema, cls_name, fields):
+        """Encodes the payload of a schema frame"""
+        return b''.join(
+            [self._u32.pack(schema), self._str(cls_name),
+             self._u16.pack(len(fields))] +
+            [self._str(name) for name in fields])
+
+    def encode(self, schema, key, record, fields):
+        """Encodes the payload of a record frame"""
+        return b''.join(
+            [self._u32.pack(schema), self._str(key)] +
+            [self._value(name, record[name]) for name in fields])
+
+    def shape(self, record):
+        """Returns (class name, field names) of a record"""
+        return (record['__class__'],
+                tuple(k for k in record if k != '__class__'))
+
+    def dump(self, records, f):
+        """Writes records to f"""
+        f.write(self.MAGIC)
+        schemas = {}
+        for key, record in records.items():
+            shape = self.shape(record)
+            schema = schemas.get(shape)
+            if schema is None:
+                schema = schemas[shape] = len(schemas)
+                payload = self.encode_schema(schema, *shape)
+                f.write(self._frame.pack(b'S', len(payload)) + payload)
+            payload = self.encode(schema, key, record, shape[1])
+            f.write(self._frame.pack(b'R', len(payload)) + payload)
+        f.write(self._frame.pack(b'E', 0))
+
+    def _read_str(self, data, pos):
+        """Decodes a string, returns it with the position after it"""
+        size, = self._u32.unpack_from(data, pos)
+        pos += 4
+        return data[pos:pos + size].decode(), pos + size
+
+    def decode(self, data, schemas):
+        """Decodes the payload of a record frame to (key, record)"""
+        u32, i64, f64 = (self._u32.unpack_from, self._i64.unpack_from,
+                         self._f64.unpack_from)
+        cls_name, fields = schemas[u32(data, 0)[0]]
+        size = u32(data, 4)[0]
+        key = data[8:8 + size].decode()
+        pos = 8 + size
+        record = {}
+        for name in fields:
+            kind = data[pos]
+            pos += 1
+            if kind == 1 or kind == 7:
+                size = u32(data, pos)[0]
+                value = data[pos + 4:pos + 4 + size].decode()
+                pos += 4 + size
+                if kind == 7:
+                    value = json.loads(value)
+            elif kind == 2:
+                value = i64(data, pos)[0]
+                pos += 8
+            elif kind == 6:
+                value = EPOCH + timedelta(microseconds=i64(data, pos)[0])
+                pos += 8
+            elif kind == 3:
+                value = f64(data, pos)[0]
+                pos += 8
+            else:
+                value = (None, None, None, None, True, False)[kind]
+            record[name] = value
+        record['__class__'] = cls_name
+        return key, record
+
+    def decode_schema(self, data):
+        """Decodes the payload of a schema frame"""
+        schema, = self._u32.unpack_from(data, 0)
+        cls_name, pos = self._read_str(data, 4)
+        count, = self._u16.unpack_from(data, pos)
+        pos += 2
+        fields = []
+        for i in range(count):
+            name, pos = self._read_str(data, pos)
+            fields.append(name)
+        return schema, cls_name, tuple(fields)
+
+    def frames(self, f):
+        """Yields (tag, payload) for the frames of f"""
+        if f.read(len(self.MAGIC)) != self.MAGIC:
+            raise ValueError("not a binary storage file")
+        size = self._frame.size
+        while True:
+            head = f.read(size)
+            if len(head) < size:
+                raise ValueError("truncated binary storage file")
+            tag, length = self._frame.unpack(head)
+            if tag == b'E':
+                return
+            data = f.read(length)
+            if len(data) < length:
+                raise ValueError("truncated binary storage file")
+            yield tag, data
+
+    def load(self, f, classes=None):
+        """Yields (key, record) from f, one record at a time"""
+        schemas = {}
+        for tag, data in self.frames(f):
+            if tag == b'S':
+                schema, cls_name, fields = self.decode_schema(data)
+                schemas[schema] = (cls_name, fields)
+                continue
+            if classes is not None:
+                schema, = self._u32.unpack_from(data, 0)
+                if schemas[schema][0] not in classes:
+                    continue
+            yield self.decode(data, schemas)
+
+
+serializers = {
+    JSONSerializer.name: JSONSerializer(),
+    BinarySerializer.name: BinarySerializer(),
+}
+
+
+def detect(path):
+    """Returns the serializer a storage file was written with"""
+    with open(path, 'rb') as f:
+        magic = f.read(len(BinarySerializer.MAGIC))
+    if magic == BinarySerializer.MAGIC:
+        return serializers['binary']
+    return serializers['json']
+
+
+def convert(src, dst, serializer=None):
+    """
+    Converts the storage file src to dst, written with serializer
+    (the other format by default)
+    """
+    reader = detect(src)
+    if serializer is None:
+        serializer = serializers[
+            'json' if reader.binary else 'binary']
+    with open(src, 'rb' if reader.binary else 'r') as f:
+        records = dict(reader.load(f))
+    with open(dst, 'wb' if serializer.binary else 'w') as f:
+        serializer.dump(records, f)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: {} <source file> <destination file>".format(
+            sys.argv[0]))
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
@@ -0,0 +1,179 @@
+#!/usr/bin/python3
+"""
+This module defines a read-only snapshot file that many processes can
+memory-map and share through the OS page cache
+
+A snapshot holds the records of the binary format (see
+models.engine.serializers) sorted by key, followed by the schemas, a
+class table (name, first index entry, count) and an index of
+(offset, length) entries in key order. Looking a key up is a binary
+search over the index, and a record is only decoded when asked for.
+
+Usage: python3 -m models.engine.snapshot <storage file> <snapshot file>
+builds a snapshot from a JSON or binary storage file.
+"""
+import mmap
+import struct
+import sys
+from models.engine.serializers import serializers, detect
+
+MAGIC = b'HBNBSNP1'
+_header = struct.Struct('<8sQQQQ')
+_entry = struct.Struct('<QI')
+_u32 = struct.Struct('<I')
+_u64 = struct.Struct('<Q')
+
+
+def write_snapshot(path, records):
+    """Writes a dict of key -> record to path as a snapshot"""
+    binary = serializers['binary']
+    schemas = {}
+    classes = []
+    index = []
+    with open(path, 'wb') as f:
+        f.write(_header.pack(MAGIC, 0, 0, 0, 0))
+        offset = _header.size
+        for key in sorted(records, key=str.encode):
+            record = records[key]
+            shape = binary.shape(record)
+            schema = schemas.setdefault(shape, len(schemas))
+            payload = binary.encode(schema, key, record, shape[1])
+            f.write(payload)
+            cls_name = key.partition('.')[0]
+            if not classes or classes[-1][0] != cls_name:
+                classes.append([cls_name, len(index), 0])
+            classes[-1][2] += 1
+            index.append(_entry.pack(offset, len(payload)))
+            offset += len(payload)
+
+        schemas_offset = offset
+        f.write(_u32.pack(len(schemas)))
+        for shape, schema in schemas.items():
+            payload = binary.encode_schema(schema, *shape)
+            f.write(_u32.pack(len(payload)) + payload)
+            offset += 4 + len(payload)
+        offset += 4
+
+        classes_offset = offset
+        f.write(_u32.pack(len(classes)))
+        for cls_name, start, count in classes:
+            name = cls_name.encode()
+            f.write(_u32.pack(len(name)) + name + _u64.pack(start) +
+                    _u64.pack(count))
+
+        index_offset = f.tell()
+        f.write(b''.join(index))
+        f.seek(0)
+        f.write(_header.pack(MAGIC, schemas_offset, classes_offset,
+                             index_offset, len(index)))
+
+
+class Snapshot:
+    """A memory-mapped, read-only snapshot file"""
+
+    def __init__(self, path):
+        """Maps the snapshot at path and reads its schemas and classes"""
+        self.__binary = serializers['binary']
+        with open(path, 'rb') as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self.__map
+        magic, schemas_offset, classes_offset, self.__index, \
+            self.__count = _header.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a snapshot file")
+
+        self.__schemas = {}
+        pos = schemas_offset + 4
+        for i in range(_u32.unpack_from(data, schemas_offset)[0]):
+            size = _u32.unpack_from(data, pos)[0]
+            schema, cls_name, fields = self.__binary.decode_schema(
+                data[pos + 4:pos + 4 + size])
+            self.__schemas[schema] = (cls_name, fields)
+            pos += 4 + size
+
+        self.__classes = {}
+        pos = classes_offset + 4
+        for i in range(_u32.unpack_from(data, classes_offset)[0]):
+            size = _u32.unpack_from(data, pos)[0]
+            name = data[pos + 4:pos + 4 + size].decode()
+            pos += 4 + size
+            start, count = _u64.unpack_from(data, pos)[0], \
+                _u64.unpack_from(data, pos + 8)[0]
+            self.__classes[name] = (start, count)
+            pos += 16
+
+    def __len__(self):
+        """Returns the number of records"""
+        return self.__count
+
+    def classes(self):
+        """Returns the names of the classes in the snapshot"""
+        return set(self.__classes)
+
+    def count(self, cls_name):
+        """Returns the number of records of a class"""
+        return self.__classes.get(cls_name, (0, 0))[1]
+
+    def __entry(self, i):
+        """Returns (offset, length) of the i-th record in key order"""
+        return _entry.unpack_from(self.__map, self.__index + i * _entry.size)
+
+    def __key(self, i):
+        """Returns the key of the i-th record, as bytes"""
+        offset = self.__entry(i)[0]
+        size = _u32.unpack_from(self.__map, offset + 4)[0]
+        return self.__map[offset + 8:offset + 8 + size]
+
+    def __decode(self, i):
+        """Decodes the i-th record to (key, record)"""
+        offset, length = self.__entry(i)
+        return self.__binary.decode(self.__map[offset:offset + length],
+                                    self.__schemas)
+
+    def __find(self, key):
+        """Returns the position of the record of key, or None"""
+        start, count = self.__classes.get(key.partition('.')[0], (0, 0))
+        wanted = key.encode()
+        low, high = start, start + count
+        while low < high:
+            middle = (low + high) // 2
+            if self.__key(middle) < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        if low < start + count and self.__key(low) == wanted:
+            return low
+        return None
+
+    def __contains__(self, key):
+        """Tells if a record is stored under key, without decoding it"""
+        return self.__find(key) is not None
+
+    def get(self, key):
+        """Returns the record stored under key, or None"""
+        i = self.__find(key)
+        return None if i is None else self.__decode(i)[1]
+
+    def records(self, cls_name=None):
+        """Yields (key, record) for a class, or all records"""
+        if cls_name is None:
+            ranges = self.__classes.values()
+        else:
+            ranges = [self.__classes.get(cls_name, (0, 0))]
+        for start, count in ranges:
+            for i in range(start, start + count):
+                yield self.__decode(i)
+
+    def close(self):
+        """Unmaps the file"""
+        self.__map.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: {} <storage file> <snapshot file>".format(
+            sys.argv[0]))
+        sys.exit(1)
+    reader = detect(sys.argv[1])
+    with open(sys.argv[1], 'rb' if reader.binary else 'r') as f:
+        write_snapshot(sys.argv[2], dict(reader.load(f)))
@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+"""
+This module defines an inverted full-text index ranked with BM25
+
+TextIndex keeps, for every word, the posting list of the keys whose
+text holds it with the number of times it does. A search only reads
+the posting lists of its own words and scores each key with BM25:
+rare words weigh more than common ones, and repeated words count
+less and less, all the more in long texts.
+"""
+import re
+from collections import Counter
+from math import log
+
+TEXT_FIELDS = {'Place': ('description',), 'Review': ('text',)}
+_word = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Returns the lower case words of text"""
+    return _word.findall(text.lower())
+
+
+def document(obj, fields):
+    """Returns the text of the fields of obj, joined"""
+    return ' '.join(value for value in
+                    (getattr(obj, field, None) for field in fields)
+                    if isinstance(value, str))
+
+
+class TextIndex:
+    """An inverted index of the words of a text per key"""
+
+    def __init__(self, k1=1.2, b=0.75):
+        """Starts an empty index with the BM25 parameters k1 and b"""
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = {}
+        self.words_of = {}
+        self.total = 0
+
+    def __len__(self):
+        """Returns the number of indexed texts"""
+        return len(self.lengths)
+
+    def add(self, key, text):
+        """Indexes the text of key, replacing the one it had before"""
+        self.remove(key)
+        words = tokenize(text)
+        if not words:
+            return
+        counts = Counter(words)
+        for word, count in counts.items():
+            self.postings.setdefault(word, {})[key] = count
+        self.lengths[key] = len(words)
+        self.words_of[key] = tuple(counts)
+        self.total += len(words)
+
+    def remove(self, key):
+        """Removes the text of key, if it is in the index"""
+        if key not in self.lengths:
+            return
+        self.total -= self.lengths.pop(key)
+        for word in self.words_of.pop(key):
+            postings = self.postings[word]
+            del postings[key]
+            if not postings:
+                del self.postings[word]
+
+    def search(self, text, limit=None, count=None, average=None):
+        """
+        Returns [(score, key)] of the keys matching text, best first.
+        The number of texts and their average length are the ones of
+        the index, unless given by count and average, when the index
+        only holds the texts matching text out of a larger collection
+        """
+        if not self.lengths:
+            return []
+        if count is None:
+            count = len(self.lengths)
+        if average is None:
+            average = self.total / len(self.lengths)
+        k1, b = self.k1, self.b
+        scores = {}
+        for word in set(tokenize(text)):
+            postings = self.postings.get(word)
+            if not postings:
+                continue
+            idf = log(1 + (count - len(postings) + 0.5) /
+                      (len(postings) + 0.5))
+            for key, tf in postings.items():
+                norm = k1 * (1 - b + b * self.lengths[key] / average)
+                scores[key] = scores.get(key, 0) + \
+                    idf * tf * (k1 + 1) / (tf + norm)
+        ranked = sorted(((score, key) for key, score in scores.items()),
+                        key=lambda found: (-found[0], found[1]))
+        return ranked if limit is None else ranked[:limit]
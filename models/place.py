@@ -1,18 +1,25 @@
 #!/usr/bin/python3
 """ Place Module for HBNB project """
+import os
 from sqlalchemy import (
     String,
     Column,
     Integer,
     Float,
-    ForeignKey
+    ForeignKey,
+    Index
 )
 from models.base_model import BaseModel, Base
+import models
 
 
-class Place(BaseModel):
+class Place(BaseModel, Base):
     """ A place to stay """
     __tablename__ = "places"
+    __table_args__ = (
+        Index('ix_places_price_by_night', 'price_by_night'),
+        Index('ix_places_latitude_longitude', 'latitude', 'longitude'),
+    )
     city_id = Column(String(60), ForeignKey("cities.id"), nullable=False)
     user_id = Column(String(60), ForeignKey("users.id"), nullable=False)
     name = Column(String(128), nullable=False)
@@ -24,3 +31,10 @@ class Place(BaseModel):
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     amenity_ids = []
+
+    if os.getenv('HBNB_TYPE_STORAGE') != 'db':
+
+        @property
+        def reviews(self):
+            """reviews getter to retrieve the reviews of the place"""
+            return models.storage.related(self, 'reviews')
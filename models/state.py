@@ -15,7 +15,7 @@ class State(BaseModel, Base):
     name = Column(String(128), nullable=False)
     cities = relationship('City', cascade='delete', backref='state')
 
-    if os.getenv('HBNB_STORAGE_TYPE') != 'db':
+    if os.getenv('HBNB_TYPE_STORAGE') != 'db':
 
         @property
         def cities(self):
@@ -23,8 +23,4 @@ class State(BaseModel, Base):
             cities getter to retreive cities
             related to the current state
             """
-            cities = []
-            for value in models.storage.all(City).values():
-                if value.state_id == self.id:
-                    cities.append(value)
-            return cities
+            return models.storage.related(self, 'cities')
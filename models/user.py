@@ -1,15 +1,29 @@
 #!/usr/bin/python3
 """This module defines a class User"""
+import os
 from sqlalchemy import Column, String
 from sqlalchemy.orm import relationship
 from models.base_model import BaseModel, Base
+import models
 
 
 class User(BaseModel, Base):
     """This class defines a user by various attributes"""
     __tablename__ = 'users'
-    email = Column(String(128), nullable=False)
+    email = Column(String(128), nullable=False, index=True)
     password = Column(String(128), nullable=False)
     first_name = Column(String(128), nullable=False)
     last_name = Column(String(128), nullable=False)
     places = relationship("Place", cascade="delete", backref="user")
+
+    if os.getenv('HBNB_TYPE_STORAGE') != 'db':
+
+        @property
+        def places(self):
+            """places getter to retrieve the places of the user"""
+            return models.storage.related(self, 'places')
+
+        @property
+        def reviews(self):
+            """reviews getter to retrieve the reviews of the user"""
+            return models.storage.related(self, 'reviews')
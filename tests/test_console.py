@@ -144,6 +144,46 @@ class TestHBNBCommand(unittest.TestCase):
             self.assertIn("'latitude': 37.77", output)
             self.assertIn("'longitude': 43.434", output)
 
+    def test_search(self):
+        """Test search command."""
+        from models import storage
+        from models.place import Place
+        quiet = Place(name="Cabin", description="A quiet cabin by the beach")
+        loud = Place(name="Club", description="Loud music, close to a beach")
+        storage.new(quiet)
+        storage.new(loud)
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("search Place quiet beach")
+            output = f.getvalue()
+            self.assertLess(output.index(quiet.id), output.index(loud.id))
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("search Place")
+            self.assertEqual("** search words missing **\n", f.getvalue())
+        with patch("sys.stdout", new=StringIO()) as f:
+            self.HBNB.onecmd("search User quiet")
+            self.assertEqual(
+                "** class has no text fields **\n", f.getvalue())
+
+    def test_count_destroy_update(self):
+        """Test count, destroy and update go through get and count."""
+        from models import storage
+        from models.state import State
+        states = [State(name=str(i)) for i in range(3)]
+        for state in states:
+            storage.new(state)
+        with patch.object(type(storage), "all", side_effect=AssertionError):
+            with patch("sys.stdout", new=StringIO()) as f:
+                self.HBNB.onecmd("count State")
+                self.assertEqual("3\n", f.getvalue())
+            self.HBNB.onecmd(f'update State {states[0].id} name "Nevada"')
+            self.assertEqual(states[0].name, "Nevada")
+            self.HBNB.onecmd(f"destroy State {states[1].id}")
+            with patch("sys.stdout", new=StringIO()) as f:
+                self.HBNB.onecmd(f"destroy State {states[1].id}")
+                self.assertEqual("** no instance found **\n", f.getvalue())
+                self.HBNB.onecmd(self.HBNB.precmd("State.count()"))
+                self.assertEqual("** no instance found **\n2\n",
+                                 f.getvalue())
 
 if __name__ == "__main__":
     unittest.main()
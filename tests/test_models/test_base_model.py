@@ -7,7 +7,10 @@ Unittest classes:
     TestBase_save
     TestBase_to_dict
     TestBase_str
+    TestBaseModel_from_dict
+    TestBaseModel_cache
 """
+import json
 import unittest
 import inspect
 from datetime import datetime
@@ -158,5 +161,77 @@ class TestBase_to_dict(unittest.TestCase):
         self.assertEqual(x.to_dict(), _dict)
 
 
+class TestBaseModel_from_dict(unittest.TestCase):
+    """Unit tests for the from_dict constructor of BaseModel"""
+
+    def test_same_as_kwargs(self):
+        x = BaseModel(name="Youssef")
+        x.number = 10
+        y = BaseModel.from_dict(x.to_dict())
+        self.assertIs(type(y), BaseModel)
+        self.assertEqual(y.to_dict(), x.to_dict())
+        self.assertEqual(y.__dict__, x.__dict__)
+
+    def test_datetimes_kept(self):
+        now = datetime.utcnow()
+        y = BaseModel.from_dict({"id": "1", "created_at": now,
+                                 "updated_at": now.isoformat()})
+        self.assertIs(y.created_at, now)
+        self.assertEqual(y.updated_at, now)
+
+    def test_missing_fields(self):
+        y = BaseModel.from_dict({"name": "Youssef"})
+        self.assertEqual(type(y.id), str)
+        self.assertEqual(type(y.created_at), datetime)
+        self.assertEqual(type(y.updated_at), datetime)
+
+    def test_record_not_changed(self):
+        record = BaseModel().to_dict()
+        saved = dict(record)
+        BaseModel.from_dict(record)
+        self.assertEqual(record, saved)
+
+
+class TestBaseModel_cache(unittest.TestCase):
+    """Unit tests for the cached to_dict and __str__ of BaseModel"""
+
+    def test_set_attribute(self):
+        x = BaseModel()
+        first, text = x.to_dict(), str(x)
+        x.name = "Youssef"
+        self.assertNotIn("name", first)
+        self.assertEqual(x.to_dict()["name"], "Youssef")
+        self.assertIn("Youssef", str(x))
+        self.assertNotEqual(str(x), text)
+
+    def test_delete_attribute(self):
+        x = BaseModel(name="Youssef")
+        self.assertIn("name", x.to_dict())
+        del x.name
+        self.assertNotIn("name", x.to_dict())
+        self.assertNotIn("Youssef", str(x))
+
+    def test_copy_returned(self):
+        x = BaseModel()
+        x.to_dict()["name"] = "Youssef"
+        self.assertNotIn("name", x.to_dict())
+
+    def test_not_in_dict(self):
+        x = BaseModel()
+        x.to_dict()
+        str(x)
+        self.assertNotIn("_cached", x.__dict__)
+        self.assertNotIn("_cached", x.to_dict())
+
+    def test_to_json(self):
+        x = BaseModel()
+        text = x.to_json()
+        self.assertIs(x.to_json(), text)
+        self.assertEqual(json.loads(text), x.to_dict())
+        x.name = "Youssef"
+        self.assertIsNot(x.to_json(), text)
+        self.assertEqual(json.loads(x.to_json())["name"], "Youssef")
+
+
 if __name__ == "__main__":
     unittest.main()
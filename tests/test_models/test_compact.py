@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""Unittest for the compact model twins"""
+
+import json
+import tracemalloc
+import unittest
+import pep8
+from models.amenity import Amenity
+from models.base_model import BaseModel
+from models.compact import compact
+from models.place import Place
+
+
+class TestCompact_docs(unittest.TestCase):
+    """Unit tests for checking the code style of models/compact.py"""
+
+    def test_pep8_conformance_compact(self):
+        """Test that 'models/compact.py' conforms to PEP 8"""
+        pep8_checker = pep8.StyleGuide(quiet=True)
+        result = pep8_checker.check_files(['models/compact.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "PEP 8 code style errors in 'compact.py'")
+
+
+class TestCompact(unittest.TestCase):
+    """Test cases for the compact twins"""
+
+    def setUp(self):
+        """Builds a Place record"""
+        self.place = Place(city_id="0001", name="My house", number_rooms=4,
+                           latitude=37.77, longitude=43.43)
+        self.record = self.place.to_dict()
+
+    def test_twin_is_cached(self):
+        """The twin of a class is built once and keeps its name"""
+        self.assertIs(compact(Place), compact(Place))
+        self.assertEqual(compact(Place).__name__, "Place")
+        self.assertFalse(hasattr(compact(Place)(), "__dict__"))
+
+    def test_to_dict_and_str(self):
+        """to_dict and __str__ match the model"""
+        twin = compact(Place)(**self.record)
+        self.assertEqual(twin.to_dict(), self.record)
+        self.assertEqual(sorted(str(twin)), sorted(str(self.place)))
+
+    def test_defaults(self):
+        """Fields never set read as the class default"""
+        twin = compact(Amenity)()
+        self.assertEqual(twin.name, "")
+        self.assertIsNone(compact(Place)(id="1").city_id)
+        self.assertEqual(compact(Place)(id="1").amenity_ids, [])
+        self.assertNotIn("amenity_ids", compact(Place)(id="1").to_dict())
+        with self.assertRaises(AttributeError):
+            twin.nothing
+
+    def test_setattr(self):
+        """Declared and undeclared attributes can both be set"""
+        twin = compact(Place)(**self.record)
+        setattr(twin, "price_by_night", 100)
+        setattr(twin, "nickname", "home")
+        self.assertEqual(twin.to_dict()["price_by_night"], 100)
+        self.assertEqual(twin.to_dict()["nickname"], "home")
+
+    def test_smaller(self):
+        """A twin takes less memory than the model"""
+        self.record["updated_at"] = self.record["created_at"]
+        text = json.dumps([self.record] * 1000)
+        sizes = []
+        for cls in (Place, compact(Place)):
+            records = json.loads(text)
+            tracemalloc.start()
+            objs = [cls(**record) for record in records]
+            sizes.append(tracemalloc.get_traced_memory()[0])
+            tracemalloc.stop()
+            del objs
+        self.assertLess(sizes[1], sizes[0], sizes)
+
+
+if __name__ == "__main__":
+    unittest.main()
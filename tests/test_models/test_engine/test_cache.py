@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+"""Unittest for the read-through object cache of DBStorage"""
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+import pep8
+from sqlalchemy import create_engine, event, inspect
+from models.city import City
+from models.state import State
+from models.engine.cache import ObjectCache, parse_policies
+from models.engine.db_storage import DBStorage
+
+
+class TestCache_docs(unittest.TestCase):
+    """Unit tests for checking the code style of cache.py"""
+
+    def test_pep8_conformance_cache(self):
+        """Test that 'models/engine/cache.py' conforms to PEP 8"""
+        pep8_checker = pep8.StyleGuide(quiet=True)
+        result = pep8_checker.check_files(['models/engine/cache.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "PEP 8 code style errors in 'cache.py'")
+
+
+class TestObjectCache(unittest.TestCase):
+    """Test cases for ObjectCache"""
+
+    def test_parse_policies(self):
+        """Policies are read as <class>[:<ttl>[:<max size>]]"""
+        self.assertEqual(parse_policies("State:300,Amenity::5,"),
+                         {"State": (300.0, 10000), "Amenity": (None, 5)})
+        self.assertEqual(set(parse_policies("1")), {"State", "Amenity"})
+
+    def test_lru(self):
+        """The least recently used objects go past max_size"""
+        cache = ObjectCache({"State": (None, 2)})
+        for id in "abc":
+            cache.put("State", id, id.upper())
+        self.assertIsNone(cache.get("State", "a"))
+        self.assertEqual(cache.get("State", "b"), "B")
+        cache.put("State", "d", "D")
+        self.assertIsNone(cache.get("State", "c"))
+        self.assertEqual(cache.stats()["State"],
+                         {"hits": 1, "misses": 2, "size": 2})
+        cache.put("City", "a", "A")
+        self.assertIsNone(cache.get("City", "a"))
+        self.assertNotIn("City", cache.stats())
+
+    def test_ttl(self):
+        """Entries older than the ttl are read again"""
+        cache = ObjectCache({"State": (10, 100)})
+        with patch('models.engine.cache.time.monotonic', return_value=0):
+            cache.put_all("State", {"State.a": "A"})
+        with patch('models.engine.cache.time.monotonic', return_value=9):
+            self.assertEqual(cache.all("State"), {"State.a": "A"})
+            self.assertEqual(cache.get("State", "a"), "A")
+        with patch('models.engine.cache.time.monotonic', return_value=10):
+            self.assertIsNone(cache.all("State"))
+            self.assertIsNone(cache.get("State", "a"))
+
+
+class TestCache_storage(unittest.TestCase):
+    """Test cases for the cache in front of DBStorage, on SQLite"""
+
+    def setUp(self):
+        """Stores a state in a database counting its SELECTs"""
+        self.db = DBStorage.__new__(DBStorage)
+        self.db._DBStorage__engine = create_engine('sqlite://')
+        self.db._DBStorage__cache = ObjectCache(parse_policies("State"))
+        self.db.reload()
+        self.selects = []
+        event.listen(self.db._DBStorage__engine, 'before_cursor_execute',
+                     self.count)
+        self.state = State(name="California")
+        self.db.new(self.state)
+        self.db.save()
+
+    def count(self, conn, cursor, statement, *args):
+        """Counts the SELECT statements"""
+        if statement.startswith("SELECT"):
+            self.selects.append(statement)
+
+    def test_read_through(self):
+        """Repeated all(cls) calls read the database once"""
+        key = "State." + self.state.id
+        for i in range(3):
+            self.assertEqual(list(self.db.all(State)), [key])
+        self.assertEqual(len(self.selects), 1)
+        self.db.all("City")
+        self.db.all("City")
+        self.assertEqual(len(self.selects), 3)
+        self.assertEqual(self.db.cache_stats()["State"]["hits"], 2)
+
+    def test_invalidation(self):
+        """new, delete and save drop the entries of their class"""
+        self.db.all(State)
+        nevada = State(name="Nevada")
+        self.db.new(nevada)
+        self.db.save()
+        self.assertEqual(len(self.db.all(State)), 2)
+        self.assertEqual(len(self.selects), 2)
+        self.db.all(State)
+        self.state.name = "CA"
+        self.db.save()
+        self.assertEqual(len(self.selects), 2)
+        self.db.all(State)
+        self.assertEqual(len(self.selects), 3)
+        self.db.delete(nevada)
+        self.db.save()
+        self.assertEqual(list(self.db.all(State)), ["State." + self.state.id])
+
+    def test_rollback(self):
+        """A rolled back transaction empties the cache"""
+        self.db.all(State)
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.new(City(name="Reno", state_id=self.state.id))
+                raise RuntimeError
+        self.db.all(State)
+        self.assertEqual(len(self.selects), 2)
+
+
+class TestCache_threads(unittest.TestCase):
+    """Test cases for cached objects shared by thread sessions"""
+
+    def setUp(self):
+        """Stores a state in a database file, caching states"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DBStorage('sqlite:///' + os.path.join(self.tmp.name,
+                                                        'hbnb.db'),
+                            cache="State")
+        self.db.reload()
+        self.state = State(name="California")
+        self.db.new(self.state)
+        self.db.save()
+
+    def tearDown(self):
+        """Removes the database file"""
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_other_thread(self):
+        """Another thread gets its own copy, and can save it"""
+        self.db.all(State)
+        errors = []
+
+        def work():
+            """Renames the cached state"""
+            try:
+                state = self.db.get(State, self.state.id)
+                self.assertIsNot(state, self.state)
+                state.name = "CA"
+                self.db.save()
+            except Exception as error:
+                errors.append(error)
+            finally:
+                self.db.close()
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+        self.assertEqual(errors, [])
+        self.db.close()
+        self.assertEqual(self.db.get(State, self.state.id).name, "CA")
+
+    def test_after_close(self):
+        """Cached objects are attached to the new session"""
+        key = "State." + self.state.id
+        self.db.all(State)
+        self.db.close()
+        session = self.db._DBStorage__session()
+        state = self.db.all(State)[key]
+        self.assertIs(inspect(state).session, session)
+        self.assertIs(self.db.get(State, self.state.id), state)
+        self.assertEqual(self.db.cache_stats()["State"]["hits"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
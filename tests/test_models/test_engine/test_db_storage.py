@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""Unittest for the DBStorage engine, run on SQLite"""
+
+import unittest
+from sqlalchemy import create_engine
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+from models.engine.db_storage import DBStorage
+
+
+class TestDBStorage(unittest.TestCase):
+    """Test cases for the DBStorage API, run on SQLite"""
+
+    def setUp(self):
+        """Stores two cities and four places in an in-memory database"""
+        self.db = DBStorage.__new__(DBStorage)
+        self.db._DBStorage__engine = create_engine('sqlite://')
+        self.db.reload()
+        sf = City(name="San Francisco", state_id="0001")
+        la = City(name="Los Angeles", state_id="0001")
+        rows = [(sf, "Loft"), (sf, "Flat"), (sf, "Room"), (la, "Villa")]
+        self.places = [Place(city_id=city.id, user_id="u1", name=name,
+                             latitude=37.7, longitude=-122.4)
+                       for city, name in rows]
+        for obj in [sf, la] + self.places:
+            self.db.new(obj)
+        self.db.save()
+
+    def test_iter(self):
+        """iter walks a table in keyset batches"""
+        ids = sorted(place.id for place in self.places)
+        self.assertEqual([p.id for p in self.db.iter(Place, batch_size=2)],
+                         ids)
+        self.assertEqual([p.id for p in self.db.iter(
+            "Place", batch_size=3, after=ids[1])], ids[2:])
+        self.assertEqual(list(self.db.iter(Place, 2, ids[-1])), [])
+        with self.assertRaises(ValueError):
+            list(self.db.iter("BaseModel"))
+
+    def test_bulk_new(self):
+        """bulk_new inserts rows parents first, with column defaults"""
+        state = State(name="Nevada")
+        city = City(name="Reno", state_id=state.id)
+        user = User(email="a@b.c", password="pwd", first_name="A",
+                    last_name="B")
+        places = [Place(city_id=city.id, user_id=user.id, name=str(i),
+                        latitude=39.5, longitude=-119.8) for i in range(5)]
+        self.db.bulk_new(places + [user, city, state], batch_size=2)
+        query = self.db.query(Place).filter(city_id=city.id)
+        self.assertEqual(query.count(), 5)
+        self.assertEqual({p.price_by_night for p in query}, {0})
+        self.assertEqual(self.db.query(State).first().id, state.id)
+        with self.assertRaises(ValueError):
+            self.db.bulk_new([City(name="x", state_id="1")], batch_size=0)
+
+    def test_get_count(self):
+        """get reads one primary key and count runs SELECT COUNT(*)"""
+        self.db.close()
+        place = self.db.get(Place, self.places[0].id)
+        self.assertEqual(place.name, "Loft")
+        self.assertIs(self.db.get("Place", place.id), place)
+        self.assertIsNone(self.db.get(Place, "missing"))
+        self.assertIsNone(self.db.get("Review", place.id))
+        self.assertEqual(self.db.count(Place), 4)
+        self.assertEqual(self.db.count("City"), 2)
+        self.assertEqual(self.db.count("Review"), 0)
+        self.assertEqual(self.db.count(), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
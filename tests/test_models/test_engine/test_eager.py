@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+"""Unittest for the eager loading of relationships in DBStorage"""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+from models import storage
+from models.city import City
+from models.state import State
+from models.engine.db_storage import parse_strategies
+
+# The relationships only exist in db mode, so the tree is loaded by a
+# new interpreter with HBNB_TYPE_STORAGE=db, on an in-memory SQLite
+# database, counting the statements it sends
+WALK = """
+import json
+from sqlalchemy import event
+from models import storage
+from models.city import City
+from models.place import Place
+from models.state import State
+
+statements = []
+event.listen(storage._DBStorage__engine, 'before_cursor_execute',
+             lambda conn, cursor, statement, *args: statements.append(1))
+for s in range(3):
+    state = State(name=str(s))
+    storage.new(state)
+    for c in range(4):
+        city = City(name=str(c), state_id=state.id)
+        storage.new(city)
+        for p in range(2):
+            storage.new(Place(city_id=city.id, user_id="u", name=str(p),
+                              latitude=0.0, longitude=0.0))
+storage.save()
+storage.close()
+counts = {}
+for name, load in (("default", None), ("load", ["cities.places"])):
+    del statements[:]
+    places = [place for state in storage.all(State, load=load).values()
+              for city in state.cities for place in city.places]
+    counts[name] = [len(places), len(statements)]
+    storage.close()
+print(json.dumps(counts))
+"""
+
+
+def walk(eager='', cache=''):
+    """Returns {"default": [places, queries], "load": [...]}"""
+    env = dict(os.environ, HBNB_TYPE_STORAGE='db', HBNB_DB_URL='sqlite://',
+               HBNB_DB_EAGER=eager, HBNB_DB_CACHE=cache)
+    done = subprocess.run([sys.executable, '-c', WALK], env=env,
+                          capture_output=True, text=True, check=True)
+    return json.loads(done.stdout)
+
+
+class TestEager(unittest.TestCase):
+    """Test cases for the loading strategies of DBStorage"""
+
+    def test_lazy_then_load(self):
+        """Lazy loading costs a query per parent, load= three in all"""
+        counts = walk()
+        self.assertEqual(counts["default"], [24, 1 + 3 + 12])
+        self.assertEqual(counts["load"], [24, 3])
+
+    def test_default_strategies(self):
+        """Default strategies apply without load="""
+        counts = walk("State.cities,City.places")
+        self.assertEqual(counts["default"], [24, 3])
+        counts = walk("State.cities:joined,City.places:joined")
+        self.assertEqual(counts["default"], [24, 1])
+        self.assertEqual(counts["load"], [24, 1])
+
+    def test_load_skips_cache(self):
+        """load= is honoured for a cached class"""
+        counts = walk(cache="State")
+        self.assertEqual(counts["default"], [24, 1 + 3 + 12])
+        self.assertEqual(counts["load"], [24, 3])
+
+    def test_parse_strategies(self):
+        """Strategies are read as <class>.<relationship>[:<strategy>]"""
+        self.assertEqual(parse_strategies("State.cities,City.places:joined"),
+                         {"State.cities": "selectin",
+                          "City.places": "joined"})
+        with self.assertRaises(ValueError):
+            parse_strategies("State.cities:eager")
+
+    def test_file_storage(self):
+        """FileStorage takes load= and finds relations in memory"""
+        storage._FileStorage__objects.clear()
+        state = State(name="California")
+        city = City(name="San Francisco", state_id=state.id)
+        storage.new(state)
+        storage.new(city)
+        states = storage.all(State, load=["cities.places"])
+        self.assertEqual(states["State." + state.id].cities, [city])
+        storage._FileStorage__objects.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,22 @@
 #!/usr/bin/python3
 """ Module for testing file storage"""
 
+import json
 import os
+import shutil
+import threading
+import time
 import unittest
+from unittest.mock import patch
 from models import storage
 from models.base_model import BaseModel
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+from models.compact import compact
 from models.engine.file_storage import FileStorage
 
 
@@ -18,13 +30,18 @@ class test_fileStorage(unittest.TestCase):
             del_list.append(key)
         for key in del_list:
             del storage._FileStorage__objects[key]
+        storage._FileStorage__pending.clear()
+        storage._FileStorage__unloaded.clear()
+        FileStorage._FileStorage__partial = None
 
     def tearDown(self):
         """ Remove storage file at end of tests """
-        try:
-            os.remove('file.json')
-        except:
-            pass
+        for path in ('file.json', 'file.json.log', 'file.bin'):
+            try:
+                os.remove(path)
+            except:
+                pass
+        shutil.rmtree('file.json.d', ignore_errors=True)
 
     def test_obj_list_empty(self):
         """ __objects is initially empty """
@@ -106,3 +123,549 @@ class test_fileStorage(unittest.TestCase):
         from models.engine.file_storage import FileStorage
         print(type(storage))
         self.assertEqual(type(storage), FileStorage)
+
+    def test_all_cls_name_and_class(self):
+        """ all(cls) accepts a class or a class name """
+        new = BaseModel()
+        amenity = Amenity()
+        storage.new(new)
+        storage.new(amenity)
+        self.assertEqual(list(storage.all(BaseModel).values()), [new])
+        self.assertEqual(list(storage.all('Amenity').values()), [amenity])
+        self.assertEqual(len(storage.all('State')), 0)
+
+    def test_all_cls_read_only(self):
+        """ all(cls) hands back a read-only view """
+        storage.new(BaseModel())
+        with self.assertRaises(TypeError):
+            storage.all(BaseModel)['BaseModel.x'] = None
+
+    def test_all_cls_after_delete(self):
+        """ delete removes the object from its class bucket """
+        new = BaseModel()
+        storage.new(new)
+        view = storage.all(BaseModel)
+        storage.delete(new)
+        self.assertEqual(len(view), 0)
+        self.assertNotIn('BaseModel.' + new.id, storage.all())
+
+    def test_all_cls_after_reload(self):
+        """ reload fills the class buckets """
+        new = Amenity()
+        storage.new(new)
+        storage.save()
+        storage._FileStorage__objects.clear()
+        storage.reload()
+        self.assertIn('Amenity.' + new.id, storage.all(Amenity))
+
+    def test_journal_save_appends(self):
+        """ Journal mode appends records instead of rewriting the file """
+        fs = FileStorage(journal=True)
+        new = BaseModel()
+        fs.new(new)
+        fs.save()
+        self.assertFalse(os.path.exists('file.json'))
+        with open('file.json.log') as f:
+            self.assertEqual(len(f.readlines()), 1)
+        new.name = "changed"
+        fs.new(new)
+        fs.save()
+        with open('file.json.log') as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_journal_reload_replays(self):
+        """ reload applies the journal on top of the storage file """
+        fs = FileStorage(journal=True)
+        kept = BaseModel()
+        gone = BaseModel()
+        fs.new(kept)
+        fs.new(gone)
+        fs.compact()
+        kept.name = "changed"
+        fs.new(kept)
+        fs.delete(gone)
+        fs.save()
+        storage._FileStorage__objects.clear()
+        fs.reload()
+        self.assertEqual(list(fs.all()), ['BaseModel.' + kept.id])
+        self.assertEqual(fs.all()['BaseModel.' + kept.id].name, "changed")
+
+    def test_journal_compaction(self):
+        """ The journal is folded into the file once it is too big """
+        fs = FileStorage(journal=True, journal_max=0)
+        fs.new(BaseModel())
+        fs.save()
+        self.assertTrue(os.path.exists('file.json'))
+        self.assertFalse(os.path.exists('file.json.log'))
+        storage._FileStorage__objects.clear()
+        fs.reload()
+        self.assertEqual(len(fs.all()), 1)
+
+    def test_lazy_reload_defers_objects(self):
+        """ Lazy reload builds objects only when they are reached """
+        first = BaseModel()
+        amenity = Amenity()
+        storage.new(first)
+        storage.new(amenity)
+        storage.save()
+        storage._FileStorage__objects.clear()
+        fs = FileStorage(lazy=True)
+        fs.reload()
+        self.assertEqual(len(storage._FileStorage__objects), 0)
+        self.assertEqual(fs.get(Amenity, amenity.id).id, amenity.id)
+        self.assertEqual(len(storage._FileStorage__objects), 1)
+        self.assertIsNone(fs.get(Amenity, 'missing'))
+        self.assertIn('BaseModel.' + first.id, fs.all(BaseModel))
+        self.assertEqual(len(fs.all()), 2)
+
+    def test_lazy_save_keeps_pending(self):
+        """ Records that were never built are still saved """
+        new = BaseModel()
+        storage.new(new)
+        storage.save()
+        storage._FileStorage__objects.clear()
+        fs = FileStorage(lazy=True)
+        fs.reload()
+        fs.new(Amenity())
+        fs.save()
+        storage._FileStorage__pending.clear()
+        fs.reload()
+        self.assertEqual(len(fs.all()), 2)
+
+    def test_reload_classes(self):
+        """ reload can be limited to some classes """
+        new = BaseModel()
+        amenity = Amenity()
+        storage.new(new)
+        storage.new(amenity)
+        storage.save()
+        storage._FileStorage__objects.clear()
+        storage.reload([Amenity])
+        self.assertEqual(list(storage.all()), ['Amenity.' + amenity.id])
+
+    def test_reload_classes_save(self):
+        """ save after reload(classes) keeps the classes left out """
+        state = State(name="California")
+        city = City(name="Fresno", state_id=state.id)
+        for obj in (state, city):
+            storage.new(obj)
+        storage.save()
+        storage._FileStorage__objects.clear()
+        FileStorage().reload(classes=["State"])
+        self.assertEqual(list(storage.all()), ['State.' + state.id])
+        storage.new(City(name="Napa", state_id=state.id))
+        storage.save()
+        storage._FileStorage__objects.clear()
+        storage.reload()
+        names = sorted(obj.name for obj in storage.all().values())
+        self.assertEqual(names, ["California", "Fresno", "Napa"])
+
+    def test_transaction_saves_once(self):
+        """ Saves inside a transaction are written once at the end """
+        with storage.transaction():
+            for i in range(3):
+                BaseModel().save()
+                self.assertFalse(os.path.exists('file.json'))
+        self.assertTrue(os.path.exists('file.json'))
+        storage._FileStorage__objects.clear()
+        storage.reload()
+        self.assertEqual(len(storage.all()), 3)
+
+    def test_transaction_rollback(self):
+        """ A failing transaction puts objects back as they were saved """
+        kept = BaseModel()
+        kept.name = "before"
+        gone = BaseModel()
+        kept.save()
+        gone.save()
+        with self.assertRaises(RuntimeError):
+            with storage.transaction():
+                kept.name = "after"
+                kept.save()
+                storage.delete(gone)
+                BaseModel().save()
+                raise RuntimeError
+        self.assertEqual(kept.name, "before")
+        self.assertEqual(set(storage.all()),
+                         {'BaseModel.' + kept.id, 'BaseModel.' + gone.id})
+        self.assertEqual(len(storage.all(BaseModel)), 2)
+
+    def test_transaction_rollback_write_behind(self):
+        """ A rollback goes back to a save still waiting to be written """
+        fs = FileStorage(write_delay=5)
+        try:
+            state = State(name="A")
+            fs.new(state)
+            fs.save()
+            with self.assertRaises(RuntimeError):
+                with fs.transaction():
+                    state.name = "B"
+                    fs.new(state)
+                    fs.save()
+                    raise RuntimeError
+            self.assertEqual(fs.get(State, state.id).name, "A")
+        finally:
+            fs.close()
+
+    def test_write_behind_coalesces(self):
+        """ A burst of saves turns into one background write """
+        fs = FileStorage(write_delay=0.2)
+        writes = []
+        write = fs._FileStorage__write
+        fs._FileStorage__write = lambda: writes.append(write())
+        for i in range(5):
+            fs.new(BaseModel())
+            fs.save()
+        self.assertEqual(writes, [])
+        fs.flush()
+        self.assertEqual(len(writes), 1)
+        fs.new(BaseModel())
+        fs.save()
+        fs.close()
+        self.assertEqual(len(writes), 2)
+        storage._FileStorage__objects.clear()
+        fs.reload()
+        self.assertEqual(len(fs.all()), 6)
+
+    def test_write_behind_background(self):
+        """ The background thread writes after the delay """
+        fs = FileStorage(write_delay=0.01)
+        fs.new(BaseModel())
+        fs.save()
+        for i in range(50):
+            if os.path.exists('file.json'):
+                break
+            time.sleep(0.01)
+        self.assertTrue(os.path.exists('file.json'))
+        fs.close()
+        self.assertIsNone(fs._FileStorage__flusher)
+
+    def test_write_behind_shards_concurrent_save(self):
+        """ A save from another thread during a flush is not lost """
+        fs = FileStorage(write_delay=5, shards='class')
+        new = BaseModel()
+        amenity = Amenity()
+        fs.new(new)
+        fs.save()
+        shard_of = FileStorage._FileStorage__shard_of
+
+        def save_amenity():
+            fs.new(amenity)
+            fs.save()
+
+        def shard_of_saving(self, key):
+            if not threads:
+                threads.append(threading.Thread(target=save_amenity))
+                threads[0].start()
+                threads[0].join()
+            return shard_of(self, key)
+        threads = []
+        with patch.object(FileStorage, '_FileStorage__shard_of',
+                          shard_of_saving):
+            fs.flush()
+        fs.close()
+        self.assertEqual(len(threads), 1)
+        storage._FileStorage__objects.clear()
+        fs.reload()
+        self.assertEqual(sorted(fs.all()),
+                         sorted(['BaseModel.' + new.id,
+                                 'Amenity.' + amenity.id]))
+
+    def test_shards_by_class(self):
+        """ Saving only rewrites the shard of the changed class """
+        fs = FileStorage(shards='class')
+        new = BaseModel()
+        amenity = Amenity()
+        fs.new(new)
+        fs.new(amenity)
+        fs.save()
+        self.assertEqual(sorted(os.listdir('file.json.d')),
+                         ['Amenity.json', 'BaseModel.json'])
+        inodes = {name: os.stat('file.json.d/' + name).st_ino
+                  for name in ('Amenity.json', 'BaseModel.json')}
+        amenity.name = "Wifi"
+        fs.new(amenity)
+        fs.save()
+        self.assertEqual(os.stat('file.json.d/BaseModel.json').st_ino,
+                         inodes['BaseModel.json'])
+        self.assertNotEqual(os.stat('file.json.d/Amenity.json').st_ino,
+                            inodes['Amenity.json'])
+
+    def test_shards_read_on_demand(self):
+        """ A shard is only read when its objects are needed """
+        fs = FileStorage(shards='class')
+        new = BaseModel()
+        amenity = Amenity()
+        fs.new(new)
+        fs.new(amenity)
+        fs.save()
+        storage._FileStorage__objects.clear()
+        fs.reload()
+        self.assertEqual(len(fs.all(Amenity)), 1)
+        self.assertEqual(storage._FileStorage__unloaded, {'BaseModel'})
+        self.assertEqual(fs.get(BaseModel, new.id).id, new.id)
+        self.assertEqual(storage._FileStorage__unloaded, set())
+
+    def test_shards_by_hash(self):
+        """ Objects are spread over hash shards and read back """
+        fs = FileStorage(shards=4)
+        ids = set()
+        for i in range(20):
+            new = BaseModel()
+            ids.add('BaseModel.' + new.id)
+            fs.new(new)
+        fs.save()
+        self.assertGreater(len(os.listdir('file.json.d')), 1)
+        storage._FileStorage__objects.clear()
+        fs.reload()
+        key = sorted(ids)[0]
+        self.assertEqual(fs.get(BaseModel, key.split('.')[1]).id,
+                         key.split('.')[1])
+        self.assertEqual(set(fs.all()), ids)
+        fs.delete(fs.all()[key])
+        fs.save()
+        storage._FileStorage__objects.clear()
+        fs.reload()
+        self.assertEqual(set(fs.all()), ids - {key})
+
+    def test_binary_format(self):
+        """ The binary serializer saves to file.bin and reloads """
+        fs = FileStorage(serializer='binary')
+        new = BaseModel()
+        new.number = 3
+        fs.new(new)
+        fs.save()
+        self.assertTrue(os.path.exists('file.bin'))
+        self.assertFalse(os.path.exists('file.json'))
+        storage._FileStorage__objects.clear()
+        fs.reload()
+        obj = fs.get(BaseModel, new.id)
+        self.assertEqual(obj.to_dict(), new.to_dict())
+
+    def test_snapshot_mode(self):
+        """ Snapshot storage decodes records on demand and is read-only """
+        new = BaseModel()
+        amenity = Amenity()
+        storage.new(new)
+        storage.new(amenity)
+        storage.export_snapshot('file.snap')
+        storage._FileStorage__objects.clear()
+        fs = FileStorage(snapshot='file.snap')
+        try:
+            fs.reload()
+            self.assertEqual(len(storage._FileStorage__objects), 0)
+            self.assertEqual(fs.get(Amenity, amenity.id).id, amenity.id)
+            self.assertEqual(len(storage._FileStorage__objects), 1)
+            self.assertEqual(list(fs.all(BaseModel)),
+                             ['BaseModel.' + new.id])
+            self.assertEqual(len(fs.all()), 2)
+            with self.assertRaises(PermissionError):
+                fs.save()
+        finally:
+            storage._FileStorage__mapped.close()
+            storage._FileStorage__mapped = None
+            os.remove('file.snap')
+
+    def test_snapshot_count(self):
+        """ count() reads the snapshot class table, not its records """
+        state = State(name="California")
+        storage.new(state)
+        for i in range(30):
+            storage.new(City(name=str(i), state_id=state.id))
+        storage.export_snapshot('file.snap')
+        storage._FileStorage__objects.clear()
+        fs = FileStorage(snapshot='file.snap')
+        try:
+            fs.reload()
+            self.assertEqual(fs.count(City), 30)
+            self.assertEqual(fs.count(), 31)
+            self.assertEqual(len(storage._FileStorage__objects), 0)
+            fs.new(City(name="Reno", state_id=state.id))
+            city = next(iter(fs._FileStorage__mapped.records("City")))[0]
+            fs.delete(fs.get(City, city[5:]))
+            self.assertEqual(fs.count(City), 30)
+            self.assertEqual(len(storage._FileStorage__objects), 1)
+            self.assertEqual(fs.count(City), len(fs.all(City)))
+        finally:
+            FileStorage._FileStorage__mapped.close()
+            FileStorage._FileStorage__mapped = None
+            os.remove('file.snap')
+
+    def test_save_encoded(self):
+        """ save() writes the cached JSON text of unchanged objects """
+        first, second = State(name="California"), State(name="Nevada")
+        storage.new(first)
+        storage.new(second)
+        storage.save()
+        with open('file.json') as f:
+            self.assertEqual(json.load(f)["State." + first.id],
+                             first.to_dict())
+        second.name = "Arizona"
+        with patch('models.engine.serializers.json.dumps',
+                   wraps=json.dumps) as dumps:
+            storage.save()
+        records = [args[0] for args, kwargs in dumps.call_args_list
+                   if isinstance(args[0], dict)]
+        self.assertEqual(records, [second.to_dict()])
+        storage._FileStorage__objects.clear()
+        storage.reload()
+        self.assertEqual(storage.get(State, second.id).name, "Arizona")
+        self.assertEqual(storage.get(State, first.id).to_dict(),
+                         first.to_dict())
+
+    def test_slots_mode(self):
+        """ Objects read from disk are built as compact twins """
+        new = BaseModel()
+        new.name = "first"
+        storage.new(new)
+        storage.save()
+        storage._FileStorage__objects.clear()
+        fs = FileStorage(slots=True)
+        fs.reload()
+        obj = fs.get(BaseModel, new.id)
+        self.assertIs(type(obj), compact(BaseModel))
+        self.assertEqual(obj.to_dict(), new.to_dict())
+        setattr(obj, 'name', "second")
+        obj.save()
+        storage._FileStorage__objects.clear()
+        fs.reload()
+        self.assertEqual(fs.get(BaseModel, new.id).name, "second")
+
+    def test_state_cities_index(self):
+        """ State.cities follows new, delete and state_id updates """
+        california = State(name="California")
+        nevada = State(name="Nevada")
+        sf = City(name="San Francisco", state_id=california.id)
+        la = City(name="Los Angeles", state_id=california.id)
+        storage.new(sf)
+        storage.new(la)
+        self.assertEqual({c.id for c in california.cities}, {sf.id, la.id})
+        self.assertEqual(nevada.cities, [])
+        la.state_id = nevada.id
+        self.assertEqual(california.cities, [sf])
+        self.assertEqual(nevada.cities, [la])
+        storage.delete(la)
+        self.assertEqual(nevada.cities, [])
+        with self.assertRaises(ValueError):
+            storage.referencing(City, 'name', "San Francisco")
+
+    def test_state_cities_after_reload(self):
+        """ The index is rebuilt from disk and in lazy mode """
+        california = State(name="California")
+        sf = City(name="San Francisco", state_id=california.id)
+        storage.new(sf)
+        storage.save()
+        storage._FileStorage__objects.clear()
+        self.assertEqual(california.cities, [])
+        storage.reload()
+        self.assertEqual([c.id for c in california.cities], [sf.id])
+        storage._FileStorage__objects.clear()
+        fs = FileStorage(lazy=True)
+        fs.reload()
+        self.assertEqual([c.id for c in california.cities], [sf.id])
+
+    def test_state_cities_lazy(self):
+        """ In lazy mode state.cities only builds the cities it returns """
+        states = [State(name=str(i)) for i in range(3)]
+        for i in range(300):
+            storage.new(City(name=str(i), state_id=states[i % 3].id))
+        storage.save()
+        storage._FileStorage__objects.clear()
+        fs = FileStorage(lazy=True)
+        fs.reload()
+        self.assertEqual(len(states[0].cities), 100)
+        self.assertEqual(len(fs._FileStorage__pending["City"]), 200)
+        self.assertEqual(len(states[0].cities), 100)
+        self.assertEqual(len(states[1].cities), 100)
+        self.assertEqual(len(fs._FileStorage__pending["City"]), 100)
+
+    def test_state_cities_rollback(self):
+        """ A rolled back state_id update is undone in the index """
+        california = State(name="California")
+        nevada = State(name="Nevada")
+        sf = City(name="San Francisco", state_id=california.id)
+        storage.new(sf)
+        storage.save()
+        with self.assertRaises(RuntimeError):
+            with storage.transaction():
+                sf.state_id = nevada.id
+                storage.new(sf)
+                raise RuntimeError
+        self.assertEqual(california.cities, [sf])
+        self.assertEqual(nevada.cities, [])
+
+    def test_related(self):
+        """ related() follows every foreign key, in both directions """
+        user = User(email="a@b.c", password="pwd")
+        city = City(name="San Francisco", state_id="0001")
+        place = Place(city_id=city.id, user_id=user.id, name="Home")
+        other = Place(city_id=city.id, user_id="nobody", name="Flat")
+        review = Review(place_id=place.id, user_id=user.id, text="Nice")
+        for obj in (user, city, place, other, review):
+            storage.new(obj)
+        self.assertEqual({p.id for p in city.places}, {place.id, other.id})
+        self.assertEqual(user.places, [place])
+        self.assertEqual(storage.related(user, "places"), [place])
+        self.assertEqual(user.reviews, [review])
+        self.assertEqual(place.reviews, [review])
+        self.assertEqual(other.reviews, [])
+        review.place_id = other.id
+        self.assertEqual(place.reviews, [])
+        self.assertEqual(other.reviews, [review])
+        with self.assertRaises(ValueError):
+            storage.related(review, "places")
+
+    def test_iter(self):
+        """ iter() walks a class in id order and resumes after a cursor """
+        states = [State(name=str(i)) for i in range(7)]
+        for state in states:
+            storage.new(state)
+        storage.new(City(name="San Francisco", state_id=states[0].id))
+        ids = sorted(state.id for state in states)
+        self.assertEqual([s.id for s in storage.iter(State, batch_size=3)],
+                         ids)
+        self.assertEqual([s.id for s in storage.iter("State", 2, ids[4])],
+                         ids[5:])
+        self.assertEqual(list(storage.iter(User)), [])
+        with self.assertRaises(ValueError):
+            list(storage.iter(State, 0))
+
+    def test_iter_lazy(self):
+        """ iter() only builds the objects it yields """
+        for i in range(5):
+            storage.new(State(name=str(i)))
+        storage.save()
+        storage._FileStorage__objects.clear()
+        fs = FileStorage(lazy=True)
+        fs.reload()
+        walk = fs.iter(State, batch_size=2)
+        first = next(walk)
+        self.assertEqual(len(fs._FileStorage__pending["State"]), 4)
+        self.assertEqual(len([first] + list(walk)), 5)
+
+    def test_bulk_new(self):
+        """ bulk_new() adds every object and writes the file once """
+        states = [State(name=str(i)) for i in range(3)]
+        with patch.object(FileStorage, '_FileStorage__write',
+                          autospec=True) as write:
+            storage.bulk_new(states)
+        write.assert_called_once()
+        self.assertEqual(len(storage.all(State)), 3)
+
+    def test_count(self):
+        """ count() adds up the objects built and pending """
+        for i in range(3):
+            storage.new(State(name=str(i)))
+        storage.new(City(name="Reno", state_id="0001"))
+        self.assertEqual(storage.count(State), 3)
+        self.assertEqual(storage.count("City"), 1)
+        self.assertEqual(storage.count(), 4)
+        self.assertEqual(storage.count(User), 0)
+        storage.save()
+        storage._FileStorage__objects.clear()
+        fs = FileStorage(lazy=True)
+        fs.reload()
+        self.assertEqual(fs.count(State), 3)
+        self.assertEqual(len(fs._FileStorage__pending["State"]), 3)
+        fs.get(State, next(iter(fs._FileStorage__pending["State"]))[6:])
+        self.assertEqual(fs.count(), 4)
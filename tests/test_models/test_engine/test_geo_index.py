@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+"""Unittest for the geospatial index and the nearby/nearest searches"""
+
+import random
+import unittest
+import pep8
+from sqlalchemy import create_engine
+from models import storage
+from models.place import Place
+from models.engine.db_storage import DBStorage
+from models.engine.geo_index import GeoIndex, bounding_box, distances, point
+
+
+class TestGeoIndex_docs(unittest.TestCase):
+    """Unit tests for checking the code style of geo_index.py"""
+
+    def test_pep8_conformance_geo_index(self):
+        """Test that 'models/engine/geo_index.py' conforms to PEP 8"""
+        pep8_checker = pep8.StyleGuide(quiet=True)
+        result = pep8_checker.check_files(['models/engine/geo_index.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "PEP 8 code style errors in 'geo_index.py'")
+
+
+class TestGeoIndex(unittest.TestCase):
+    """Test cases for GeoIndex"""
+
+    def setUp(self):
+        """Indexes random points, some near the antimeridian and poles"""
+        rand = random.Random(7)
+        self.points = {str(i): (rand.uniform(-89, 89),
+                                rand.uniform(-180, 180))
+                       for i in range(2000)}
+        self.points.update({"east": (0.1, 179.9), "west": (0.1, -179.9),
+                            "north": (89.9, 12.0)})
+        self.index = GeoIndex()
+        for key, (lat, lon) in self.points.items():
+            self.index.add(key, lat, lon)
+
+    def brute(self, lat, lon):
+        """Returns every [(distance, key)], nearest first"""
+        return sorted(distances(lat, lon, [
+            point(key, *latlon) for key, latlon in self.points.items()]))
+
+    def test_within(self):
+        """within finds exactly the points of the circle"""
+        for lat, lon, radius in ((48.85, 2.35, 900), (0, 180, 50),
+                                 (89, -100, 400), (-30, 20, 15000)):
+            expected = [found for found in self.brute(lat, lon)
+                        if found[0] <= radius]
+            self.assertEqual(self.index.within(lat, lon, radius), expected)
+        found = self.index.within(0.1, 179.95, 20)
+        self.assertEqual({key for distance, key in found}, {"east", "west"})
+
+    def test_nearest(self):
+        """nearest finds the k points of smallest distance"""
+        for lat, lon in ((37.77, -122.41), (89.5, 0), (0, -180)):
+            self.assertEqual(self.index.nearest(lat, lon, 5),
+                             self.brute(lat, lon)[:5])
+        self.assertEqual(len(self.index.nearest(0, 0, 5000)), 2003)
+
+    def test_add_remove(self):
+        """Moved and removed points are found at their new place"""
+        self.index.add("east", 10, 10)
+        self.assertEqual(self.index.nearest(10, 10, 1)[0][1], "east")
+        self.index.remove("east")
+        self.index.add("west", None, None)
+        self.assertEqual(len(self.index), 2001)
+
+    def test_bounding_box(self):
+        """The box wraps around the antimeridian and the poles"""
+        self.assertEqual(len(bounding_box(0, 179.9, 100)[2]), 2)
+        self.assertEqual(bounding_box(89.9, 0, 100)[2], [(-180, 180)])
+
+
+def make_places():
+    """Returns places in San Francisco, Oakland and Paris"""
+    return [Place(name=name, city_id="0001", user_id="0001",
+                  latitude=lat, longitude=lon)
+            for name, lat, lon in (("sf", 37.7749, -122.4194),
+                                   ("oakland", 37.8044, -122.2712),
+                                   ("paris", 48.8566, 2.3522))]
+
+
+class TestGeoIndex_storage(unittest.TestCase):
+    """Test cases for nearby and nearest on both engines"""
+
+    def setUp(self):
+        """Stores the places"""
+        storage._FileStorage__objects.clear()
+        self.places = make_places()
+        for place in self.places:
+            storage.new(place)
+
+    def tearDown(self):
+        """Empties the storage"""
+        storage._FileStorage__objects.clear()
+
+    def test_file_storage(self):
+        """FileStorage answers from the index and follows updates"""
+        sf, oakland, paris = self.places
+        self.assertEqual(storage.nearby(37.78, -122.41, 30), [sf, oakland])
+        self.assertEqual(storage.nearest(48, 2, 1), [paris])
+        oakland.latitude, oakland.longitude = 48.86, 2.35
+        self.assertEqual(storage.nearby(37.78, -122.41, 30), [sf])
+        self.assertEqual(storage.nearest(48.8566, 2.3522, 3)[0], paris)
+        storage.delete(paris)
+        self.assertEqual(storage.nearest(48.8566, 2.3522, 3),
+                         [oakland, sf])
+
+    def test_db_storage(self):
+        """DBStorage selects the bounding box, then checks distances"""
+        db = DBStorage.__new__(DBStorage)
+        db._DBStorage__engine = create_engine('sqlite://')
+        db.reload()
+        for place in self.places:
+            db.new(place)
+        db.save()
+        sf, oakland, paris = self.places
+        self.assertEqual(db.nearby(37.78, -122.41, 30), [sf, oakland])
+        self.assertEqual(db.nearby(37.78, -122.41, 5), [sf])
+        self.assertEqual(db.nearest(48, 2, 2), [paris, oakland])
+
+
+if __name__ == "__main__":
+    unittest.main()
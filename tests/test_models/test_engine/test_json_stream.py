@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+""" Module for testing the streaming JSON reader"""
+
+import io
+import json
+import unittest
+from models.engine.json_stream import iter_records
+
+
+class test_iter_records(unittest.TestCase):
+    """ Class to test iter_records """
+
+    def setUp(self):
+        """ Set up a small storage document """
+        self.data = {
+            "State.1": {"__class__": "State", "id": "1", "name": "CA"},
+            "City.2": {"__class__": "City", "id": "2", "n": 12345},
+            "Review.3": {"__class__": "Review", "text": 'a "}" b'},
+        }
+        self.text = json.dumps(self.data, indent=2)
+
+    def test_matches_json_load(self):
+        """ Records are the same as json.load, whatever the chunk size """
+        for chunk_size in (1, 3, 7, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                f = io.StringIO(self.text)
+                self.assertEqual(dict(iter_records(f, None, chunk_size)),
+                                 self.data)
+
+    def test_filter_classes(self):
+        """ Only the records of the given classes are yielded """
+        f = io.StringIO(self.text)
+        self.assertEqual([k for k, v in iter_records(f, {'City'}, 5)],
+                         ['City.2'])
+
+    def test_empty_object(self):
+        """ An empty object yields nothing """
+        self.assertEqual(list(iter_records(io.StringIO(' {} '))), [])
+
+    def test_malformed(self):
+        """ Empty or truncated input raises ValueError """
+        for text in ('', '  ', '{"a": {}', '{"a" {}}', '[]'):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    list(iter_records(io.StringIO(text), None, 2))
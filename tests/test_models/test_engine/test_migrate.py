@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+"""Unittest for the declared indexes and their migration"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import pep8
+from sqlalchemy import Index, text
+from models.place import Place
+from models.user import User
+from models.engine.db_storage import DBStorage
+from models.engine.migrate import missing_indexes
+
+INDEXES = ['ix_places_latitude_longitude', 'ix_places_price_by_night',
+           'ix_users_email']
+
+
+class TestMigrate_docs(unittest.TestCase):
+    """Unit tests for checking the code style of migrate.py"""
+
+    def test_pep8_conformance_migrate(self):
+        """Test that 'models/engine/migrate.py' conforms to PEP 8"""
+        pep8_checker = pep8.StyleGuide(quiet=True)
+        result = pep8_checker.check_files(['models/engine/migrate.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "PEP 8 code style errors in 'migrate.py'")
+
+
+class TestMigrate(unittest.TestCase):
+    """Test cases for adding the missing indexes to a SQLite file"""
+
+    def setUp(self):
+        """Creates the tables, then drops the declared indexes"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.url = 'sqlite:///' + os.path.join(self.tmp.name, 'hbnb.db')
+        self.db = DBStorage(self.url)
+        self.db.reload()
+        self.engine = self.db._DBStorage__engine
+        for table in (Place.__table__, User.__table__):
+            for index in table.indexes:
+                index.drop(bind=self.engine)
+
+    def tearDown(self):
+        """Removes the database file"""
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def plan(self, sql):
+        """Returns the SQLite query plan of sql"""
+        with self.engine.connect() as connection:
+            rows = connection.execute(text("EXPLAIN QUERY PLAN " + sql))
+            return ' '.join(row[3] for row in rows)
+
+    def test_migrate(self):
+        """migrate() adds the missing indexes once, in place"""
+        sql = "SELECT * FROM places WHERE price_by_night > 10"
+        self.assertNotIn("ix_places_price_by_night", self.plan(sql))
+        found = self.db.migrate(dry_run=True)
+        self.assertEqual(sorted(index.name for index in found), INDEXES)
+        self.assertEqual(len(missing_indexes(self.engine)), 3)
+        self.db.migrate()
+        self.assertEqual(missing_indexes(self.engine), [])
+        self.assertEqual(self.db.migrate(), [])
+        self.assertIn("ix_places_price_by_night", self.plan(sql))
+        self.assertIn("ix_users_email",
+                      self.plan("SELECT * FROM users WHERE email = 'a'"))
+
+    def test_same_columns(self):
+        """An index on the same columns under another name is kept"""
+        Index('users_by_email', User.__table__.c.email).create(
+            bind=self.engine)
+        names = [index.name for index in missing_indexes(self.engine)]
+        self.assertEqual(names, INDEXES[:2])
+
+    def test_command(self):
+        """The module adds the indexes of the database of its argument"""
+        command = [sys.executable, '-m', 'models.engine.migrate']
+        done = subprocess.run(command + ['--dry-run', self.url],
+                              capture_output=True, text=True, check=True)
+        self.assertIn("missing ix_users_email on users(email)", done.stdout)
+        done = subprocess.run(command + [self.url], capture_output=True,
+                              text=True, check=True)
+        self.assertEqual(len(done.stdout.splitlines()), 3)
+        self.assertEqual(missing_indexes(self.engine), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
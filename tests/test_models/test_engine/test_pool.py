@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+"""Unittest for the connection pool of DBStorage and its metrics"""
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+import pep8
+from sqlalchemy.exc import TimeoutError
+from models.state import State
+from models.engine.db_storage import DBStorage
+from models.engine.pool import BUCKETS, PoolMetrics
+
+
+class TestPool_docs(unittest.TestCase):
+    """Unit tests for checking the code style of pool.py"""
+
+    def test_pep8_conformance_pool(self):
+        """Test that 'models/engine/pool.py' conforms to PEP 8"""
+        pep8_checker = pep8.StyleGuide(quiet=True)
+        result = pep8_checker.check_files(['models/engine/pool.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "PEP 8 code style errors in 'pool.py'")
+
+
+class TestPoolMetrics(unittest.TestCase):
+    """Test cases for PoolMetrics"""
+
+    def test_histogram(self):
+        """Latencies are counted in the first bucket holding them"""
+        metrics = PoolMetrics()
+        for seconds in (0.00005, 0.002, 0.002, 7):
+            metrics.checked_out(seconds)
+        metrics.waited(0.5)
+        snapshot = metrics.snapshot()
+        counts = dict(snapshot['latency_histogram'])
+        self.assertEqual(counts[0.0001], 1)
+        self.assertEqual(counts[0.005], 2)
+        self.assertEqual(counts[BUCKETS[-1]], 1)
+        self.assertEqual(snapshot['checkouts'], 4)
+        self.assertEqual(snapshot['latency_max'], 7)
+        self.assertEqual(snapshot['wait_max'], 0.5)
+
+
+class TestPool_storage(unittest.TestCase):
+    """Test cases for the pool of DBStorage, on a SQLite file"""
+
+    def setUp(self):
+        """Creates a database file"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.url = 'sqlite:///' + os.path.join(self.tmp.name, 'hbnb.db')
+
+    def tearDown(self):
+        """Removes the database file"""
+        self.tmp.cleanup()
+
+    def test_settings_from_environment(self):
+        """The pool is configured from the HBNB_DB_* variables"""
+        env = {'HBNB_DB_URL': self.url, 'HBNB_DB_POOL_SIZE': '3',
+               'HBNB_DB_MAX_OVERFLOW': '0', 'HBNB_DB_POOL_RECYCLE': '60',
+               'HBNB_DB_LIVENESS': 'optimistic'}
+        with patch.dict(os.environ, env):
+            db = DBStorage()
+        pool = db._DBStorage__engine.pool
+        self.assertEqual((pool.size(), pool._max_overflow), (3, 0))
+        self.assertEqual(pool._recycle, 60)
+        self.assertFalse(pool._pre_ping)
+        self.assertTrue(DBStorage(self.url)._DBStorage__engine.pool._pre_ping)
+        with self.assertRaises(ValueError):
+            DBStorage(self.url, liveness="hopeful")
+
+    def test_threads(self):
+        """Concurrent sessions share the pool and are all counted"""
+        db = DBStorage(self.url, pool_size=2, max_overflow=1)
+        db.reload()
+        db.new(State(name="California"))
+        db.save()
+        db.close()
+        errors = []
+
+        def work():
+            """Reads from a session of its own"""
+            try:
+                for i in range(5):
+                    self.assertEqual(db.query(State).count(), 1)
+                    db.close()
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=work) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        metrics = db.pool_metrics()
+        self.assertEqual(metrics['size'], 2)
+        self.assertEqual(metrics['checked_out'], 0)
+        self.assertGreaterEqual(metrics['checkouts'], 41)
+        self.assertEqual(sum(count for bound, count
+                             in metrics['latency_histogram']),
+                         metrics['checkouts'])
+
+    def test_transaction_per_thread(self):
+        """A transaction only defers the saves of its own thread"""
+        db = DBStorage(self.url)
+        db.reload()
+
+        def work():
+            """Saves a state from another thread"""
+            db.new(State(name="Nevada"))
+            db.save()
+            db.close()
+
+        with db.transaction():
+            db.new(State(name="California"))
+            db.save()
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+            self.assertEqual(db.count(State), 2)
+        db.close()
+        self.assertEqual(db.count(State), 2)
+
+    def test_timeout(self):
+        """A checkout waits pool_timeout seconds for a free connection"""
+        db = DBStorage(self.url, pool_size=1, max_overflow=0,
+                       pool_timeout=0.05)
+        engine = db._DBStorage__engine
+        with engine.connect():
+            self.assertEqual(db.pool_metrics()['checked_out'], 1)
+            with self.assertRaises(TimeoutError):
+                engine.connect()
+        self.assertGreaterEqual(db.pool_metrics()['wait_max'], 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
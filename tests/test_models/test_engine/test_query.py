@@ -0,0 +1,216 @@
+#!/usr/bin/python3
+"""Unittest for the storage query API"""
+
+import os
+import unittest
+import pep8
+from sqlalchemy import create_engine
+from models import storage
+from models.city import City
+from models.place import Place
+from models.engine.db_storage import DBStorage
+from models.engine.file_storage import FileStorage
+from models.engine.range_index import RangeIndex
+
+
+class TestQuery_docs(unittest.TestCase):
+    """Unit tests for checking the code style of models/engine/query.py"""
+
+    def test_pep8_conformance_query(self):
+        """Test that 'models/engine/query.py' conforms to PEP 8"""
+        pep8_checker = pep8.StyleGuide(quiet=True)
+        result = pep8_checker.check_files(['models/engine/query.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "PEP 8 code style errors in 'query.py'")
+
+
+def make_places():
+    """Returns two cities and four places spread over them"""
+    sf = City(name="San Francisco", state_id="0001")
+    la = City(name="Los Angeles", state_id="0001")
+    rows = [(sf, "u1", "Loft", 250), (sf, "u1", "Flat", 120),
+            (sf, "u2", "Room", 60), (la, "u2", "Villa", 90)]
+    places = [Place(city_id=city.id, user_id=user, name=name,
+                    price_by_night=price, latitude=37.7, longitude=-122.4)
+              for city, user, name, price in rows]
+    return sf, la, places
+
+
+class TestQuery_file(unittest.TestCase):
+    """Test cases for queries on FileStorage"""
+
+    def setUp(self):
+        """Stores two cities and four places"""
+        storage._FileStorage__objects.clear()
+        storage._FileStorage__pending.clear()
+        storage._FileStorage__unloaded.clear()
+        self.sf, self.la, self.places = make_places()
+        for obj in [self.sf, self.la] + self.places:
+            storage.new(obj)
+
+    def tearDown(self):
+        """Empties the storage"""
+        storage._FileStorage__objects.clear()
+
+    def test_filter_order_limit(self):
+        """filter, order_by and limit combine"""
+        query = storage.query(Place).filter(
+            city_id=self.sf.id, price_by_night__lt=200)
+        ordered = query.order_by('price_by_night')
+        self.assertEqual([p.name for p in ordered.all()], ["Room", "Flat"])
+        self.assertEqual(ordered.plan, "index Place.city_id")
+        self.assertEqual(query.order_by('-name').limit(1).all(),
+                         [self.places[2]])
+        self.assertEqual(query.count(), 2)
+        self.assertEqual(query.plan, "index Place.city_id")
+        self.assertEqual(query.order_by('name').limit(1).count(), 1)
+
+    def test_scan(self):
+        """A query without an indexed equality scans the class"""
+        query = storage.query("Place").filter(price_by_night__gte=100)
+        self.assertEqual({p.name for p in query.all()}, {"Loft", "Flat"})
+        self.assertEqual(query.plan, "scan Place")
+        self.assertIsNone(storage.query(Place).filter(name="None").first())
+
+    def test_smallest_index(self):
+        """The planner picks the index matching the fewest objects"""
+        query = storage.query(Place).filter(city_id=self.sf.id,
+                                            user_id="u2")
+        self.assertEqual(query.explain(), "index Place.user_id")
+        self.assertEqual(query.all(), [self.places[2]])
+        query = storage.query(Place).filter(
+            city_id__in=[self.la.id, self.la.id])
+        self.assertEqual(query.all(), [self.places[3]])
+        self.assertEqual(query.plan, "index Place.city_id")
+
+    def test_unknown_lookup(self):
+        """An unknown lookup is refused"""
+        with self.assertRaises(ValueError):
+            storage.query(Place).filter(price_by_night__near=10)
+
+
+class TestQuery_range(unittest.TestCase):
+    """Test cases for the range indexes of FileStorage"""
+
+    def setUp(self):
+        """Stores four places with range indexes on"""
+        storage._FileStorage__objects.clear()
+        self.fs = FileStorage(ranges=True)
+        self.sf, self.la, self.places = make_places()
+        for obj in self.places:
+            self.fs.new(obj)
+
+    def tearDown(self):
+        """Empties the storage"""
+        storage._FileStorage__objects.clear()
+        for path in ('file.json',):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_range(self):
+        """Bounds on a numeric field read a slice of the index"""
+        query = self.fs.query(Place).filter(price_by_night__gte=90,
+                                            price_by_night__lt=250)
+        self.assertEqual({p.name for p in query.all()}, {"Flat", "Villa"})
+        self.assertEqual(query.plan, "range Place.price_by_night")
+        query = self.fs.query(Place).filter(price_by_night=60)
+        self.assertEqual(query.all(), [self.places[2]])
+        query = self.fs.query(Place).filter(price_by_night__gt=1000)
+        self.assertEqual(query.all(), [])
+
+    def test_top_k(self):
+        """order_by and limit walk the index in order"""
+        query = self.fs.query(Place).order_by('-price_by_night').limit(2)
+        self.assertEqual([p.name for p in query.all()], ["Loft", "Flat"])
+        self.assertEqual(query.plan, "ordered Place.price_by_night")
+        query = self.fs.query(Place).filter(user_id="u2").order_by(
+            'price_by_night').limit(1)
+        self.assertEqual(query.all(), [self.places[2]])
+
+    def test_console_update(self):
+        """The index follows updates made from the console"""
+        from console import HBNBCommand
+        loft = self.places[0]
+        HBNBCommand().onecmd(f"update Place {loft.id} price_by_night 10")
+        self.assertEqual(loft.price_by_night, 10)
+        query = self.fs.query(Place).filter(price_by_night__lt=50)
+        self.assertEqual(query.all(), [loft])
+        query = self.fs.query(Place).order_by('price_by_night').limit(1)
+        self.assertEqual(query.all(), [loft])
+        self.fs.delete(loft)
+        self.assertEqual(query.all(), [self.places[2]])
+
+    def test_range_index(self):
+        """RangeIndex keeps keys sorted by value, then key"""
+        index = RangeIndex()
+        for key, value in (("c", 2), ("a", 2), ("b", 1), ("d", None)):
+            index.add(key, value)
+        self.assertEqual(list(index.between()), ["b", "a", "c"])
+        self.assertEqual(list(index.others), ["d"])
+        index.add("a", 0)
+        index.remove("c")
+        self.assertEqual(list(index.between(descending=True)), ["b", "a"])
+        self.assertEqual(index.bounds([("gte", 1)]), (1, 2))
+        self.assertIsNone(index.bounds([("gte", "1")]))
+
+
+class TestQuery_db(unittest.TestCase):
+    """Test cases for queries on DBStorage, run on SQLite"""
+
+    def setUp(self):
+        """Stores two cities and four places in an in-memory database"""
+        self.db = DBStorage.__new__(DBStorage)
+        self.db._DBStorage__engine = create_engine('sqlite://')
+        self.db.reload()
+        self.sf, self.la, self.places = make_places()
+        for obj in [self.sf, self.la] + self.places:
+            self.db.new(obj)
+        self.db.save()
+
+    def test_one_statement(self):
+        """A query compiles to one SELECT"""
+        query = self.db.query(Place).filter(
+            city_id=self.sf.id, price_by_night__lt=200)
+        query = query.order_by('-price_by_night')
+        self.assertEqual([p.name for p in query], ["Flat", "Room"])
+        self.assertTrue(query.plan.startswith("sql: SELECT"))
+        self.assertIn("ORDER BY places.price_by_night DESC", query.plan)
+        self.assertEqual(query.limit(1).all(), [self.places[1]])
+        self.assertEqual(self.db.query("Place").filter(
+            city_id__in=[self.la.id]).count(), 1)
+
+    def test_count(self):
+        """count runs one SELECT COUNT over the filtered rows"""
+        self.db.close()
+        query = self.db.query(Place).filter(city_id=self.sf.id)
+        self.assertEqual(query.count(), 3)
+        self.assertEqual(query.order_by('name').limit(2).count(), 2)
+        self.assertEqual(len(self.db._DBStorage__session().identity_map), 0)
+        self.assertTrue(query.plan.startswith("sql: SELECT count(*)"))
+
+    def test_ne_null(self):
+        """ne leaves out the rows where the field is None on both engines"""
+        self.places[0].description = "Sunny"
+        self.places[1].description = "Dark"
+        self.db.new(self.places[0])
+        self.db.new(self.places[1])
+        self.db.save()
+        storage._FileStorage__objects.clear()
+        for obj in [self.sf, self.la] + self.places:
+            storage.new(obj)
+        try:
+            for engine in (storage, self.db):
+                query = engine.query(Place).filter(description__ne="Dark")
+                self.assertEqual([p.name for p in query], ["Loft"])
+                self.assertEqual(query.count(), 1)
+        finally:
+            storage._FileStorage__objects.clear()
+
+    def test_unknown_column(self):
+        """A filter on a field with no column is refused"""
+        with self.assertRaises(ValueError):
+            self.db.query(Place).filter(nickname="home").all()
+
+
+if __name__ == "__main__":
+    unittest.main()
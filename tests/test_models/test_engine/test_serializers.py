@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+""" Module for testing the storage file serializers"""
+
+import io
+import os
+import unittest
+from datetime import datetime
+from models.engine.serializers import serializers, convert, detect
+
+
+class test_serializers(unittest.TestCase):
+    """ Class to test the JSON and binary serializers """
+
+    def setUp(self):
+        """ Set up records like the ones to_dict builds """
+        self.records = {
+            "Place.1": {"__class__": "Place", "id": "1", "name": "Flat",
+                        "created_at": "2023-10-10T08:08:59.234200",
+                        "updated_at": "2023-10-10T08:08:59.234201",
+                        "number_rooms": 3, "latitude": 37.77,
+                        "description": None, "amenity_ids": ["a", "b"],
+                        "big": 1 << 70, "open": True},
+            "State.2": {"__class__": "State", "id": "2", "name": "CA",
+                        "created_at": "2023-10-10T08:08:59.000000",
+                        "updated_at": "2023-10-10T08:08:59.000000"},
+        }
+
+    def tearDown(self):
+        """ Remove the converted files """
+        for path in ('test_records.json', 'test_records.bin',
+                     'test_records2.json'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def round_trip(self, serializer, classes=None):
+        """ Dumps the records and loads them back """
+        f = io.BytesIO() if serializer.binary else io.StringIO()
+        serializer.dump(self.records, f)
+        f.seek(0)
+        return dict(serializer.load(f, classes))
+
+    def test_json_round_trip(self):
+        """ The JSON format gives back the same records """
+        self.assertEqual(self.round_trip(serializers['json']), self.records)
+
+    def test_binary_round_trip(self):
+        """ The binary format gives back typed values """
+        loaded = self.round_trip(serializers['binary'])
+        self.assertEqual(loaded.keys(), self.records.keys())
+        place = loaded['Place.1']
+        self.assertEqual(place['created_at'],
+                         datetime(2023, 10, 10, 8, 8, 59, 234200))
+        for key, value in self.records['Place.1'].items():
+            if key not in ('created_at', 'updated_at'):
+                self.assertEqual(place[key], value)
+
+    def test_binary_filter_classes(self):
+        """ Records of other classes are skipped """
+        loaded = self.round_trip(serializers['binary'], {'State'})
+        self.assertEqual(list(loaded), ['State.2'])
+
+    def test_binary_smaller(self):
+        """ The binary format is smaller than JSON """
+        records = {}
+        for i in range(100):
+            record = dict(self.records['Place.1'], id=str(i))
+            records['Place.' + str(i)] = record
+        self.records = records
+        binary, text = io.BytesIO(), io.StringIO()
+        serializers['binary'].dump(records, binary)
+        serializers['json'].dump(records, text)
+        self.assertLess(len(binary.getvalue()), len(text.getvalue()))
+
+    def test_convert(self):
+        """ Files convert both ways """
+        with open('test_records.json', 'w') as f:
+            serializers['json'].dump(self.records, f)
+        convert('test_records.json', 'test_records.bin')
+        self.assertIs(detect('test_records.bin'), serializers['binary'])
+        convert('test_records.bin', 'test_records2.json')
+        self.assertIs(detect('test_records2.json'), serializers['json'])
+        with open('test_records2.json') as f:
+            self.assertEqual(dict(serializers['json'].load(f)),
+                             self.records)
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+""" Module for testing memory-mapped snapshots"""
+
+import os
+import unittest
+from datetime import datetime
+from models.engine.snapshot import Snapshot, write_snapshot
+
+
+class test_snapshot(unittest.TestCase):
+    """ Class to test Snapshot and write_snapshot """
+
+    def setUp(self):
+        """ Write a snapshot of a few records """
+        now = "2023-10-10T08:08:59.234200"
+        self.records = {}
+        for cls_name, count in (('State', 3), ('City', 5), ('Review', 1)):
+            for i in range(count):
+                key = '{}.{}'.format(cls_name, i)
+                self.records[key] = {'__class__': cls_name, 'id': str(i),
+                                     'created_at': now, 'updated_at': now,
+                                     'name': key}
+        write_snapshot('test.snap', self.records)
+        self.snapshot = Snapshot('test.snap')
+
+    def tearDown(self):
+        """ Remove the snapshot """
+        self.snapshot.close()
+        os.remove('test.snap')
+
+    def test_counts(self):
+        """ Record and class counts come from the tables """
+        self.assertEqual(len(self.snapshot), 9)
+        self.assertEqual(self.snapshot.classes(), {'State', 'City', 'Review'})
+        self.assertEqual(self.snapshot.count('City'), 5)
+        self.assertEqual(self.snapshot.count('Place'), 0)
+
+    def test_get(self):
+        """ Records are found by key """
+        for key in self.records:
+            with self.subTest(key=key):
+                record = self.snapshot.get(key)
+                self.assertEqual(record['name'], key)
+                self.assertEqual(record['created_at'],
+                                 datetime(2023, 10, 10, 8, 8, 59, 234200))
+        self.assertIsNone(self.snapshot.get('City.9'))
+        self.assertIsNone(self.snapshot.get('Place.0'))
+
+    def test_records(self):
+        """ Records come back by class, in key order """
+        self.assertEqual([k for k, v in self.snapshot.records('State')],
+                         ['State.0', 'State.1', 'State.2'])
+        self.assertEqual(len(list(self.snapshot.records())), 9)
+
+    def test_not_a_snapshot(self):
+        """ Other files are rejected """
+        with open('test.snap', 'wb') as f:
+            f.write(b'{}' * 40)
+        with self.assertRaises(ValueError):
+            Snapshot('test.snap')
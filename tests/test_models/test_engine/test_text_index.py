@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+"""Unittest for the full-text index and the search of both engines"""
+
+import unittest
+import pep8
+from sqlalchemy import create_engine
+from models import storage
+from models.place import Place
+from models.review import Review
+from models.engine.db_storage import DBStorage, _escape_like
+from models.engine.text_index import TextIndex, tokenize
+
+
+class TestTextIndex_docs(unittest.TestCase):
+    """Unit tests for checking the code style of text_index.py"""
+
+    def test_pep8_conformance_text_index(self):
+        """Test that 'models/engine/text_index.py' conforms to PEP 8"""
+        pep8_checker = pep8.StyleGuide(quiet=True)
+        result = pep8_checker.check_files(['models/engine/text_index.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "PEP 8 code style errors in 'text_index.py'")
+
+
+class TestTextIndex(unittest.TestCase):
+    """Test cases for TextIndex"""
+
+    def setUp(self):
+        """Indexes a few texts"""
+        self.index = TextIndex()
+        self.index.add("a", "Quiet flat, quiet street, close to the beach")
+        self.index.add("b", "Flat in the city centre")
+        self.index.add("c", "Beach house")
+        self.index.add("d", "")
+
+    def test_tokenize(self):
+        """Words are lower cased and split on punctuation"""
+        self.assertEqual(tokenize("Quiet, QUIET beach-house!"),
+                         ["quiet", "quiet", "beach", "house"])
+
+    def test_ranking(self):
+        """Rarer and repeated words rank higher"""
+        found = [key for score, key in self.index.search("quiet beach")]
+        self.assertEqual(found, ["a", "c"])
+        found = [key for score, key in self.index.search("beach")]
+        self.assertEqual(found, ["c", "a"])
+        self.assertEqual(self.index.search("nothing"), [])
+        self.assertEqual(len(self.index.search("flat beach", 1)), 1)
+
+    def test_add_remove(self):
+        """Replaced and removed texts leave no posting behind"""
+        self.index.add("c", "City loft")
+        self.assertNotIn("c", self.index.postings["beach"])
+        self.index.remove("a")
+        self.index.remove("c")
+        self.index.remove("missing")
+        self.assertNotIn("beach", self.index.postings)
+        self.assertEqual(len(self.index), 1)
+        self.assertEqual(self.index.total, 5)
+
+
+class TestTextIndex_storage(unittest.TestCase):
+    """Test cases for search on both engines"""
+
+    def setUp(self):
+        """Stores places and a review"""
+        storage._FileStorage__objects.clear()
+        self.quiet = Place(name="Cabin", city_id="1", user_id="1",
+                           latitude=0.0, longitude=0.0,
+                           description="A quiet cabin by the beach")
+        self.loud = Place(name="Club", city_id="1", user_id="1",
+                          latitude=0.0, longitude=0.0,
+                          description="Loud music, close to a beach")
+        self.review = Review(text="So quiet!", place_id=self.quiet.id)
+        for obj in (self.quiet, self.loud, self.review):
+            storage.new(obj)
+
+    def tearDown(self):
+        """Empties the storage"""
+        storage._FileStorage__objects.clear()
+
+    def test_file_storage(self):
+        """FileStorage searches its index and follows updates"""
+        self.assertEqual(storage.search(Place, "quiet beach"),
+                         [self.quiet, self.loud])
+        self.assertEqual(storage.search("Review", "quiet"), [self.review])
+        self.loud.description = "Quiet nights, quiet beach"
+        self.assertEqual(storage.search(Place, "quiet beach")[0], self.loud)
+        storage.delete(self.loud)
+        self.assertEqual(storage.search(Place, "beach"), [self.quiet])
+        with self.assertRaises(ValueError):
+            storage.search("User", "quiet")
+
+    def test_db_storage(self):
+        """DBStorage selects the rows holding a word, then ranks them"""
+        db = DBStorage.__new__(DBStorage)
+        db._DBStorage__engine = create_engine('sqlite://')
+        db.reload()
+        db.new(self.quiet)
+        db.new(self.loud)
+        db.save()
+        self.assertEqual(db.search(Place, "quiet beach"),
+                         [self.quiet, self.loud])
+        self.assertEqual(db.search(Place, "music"), [self.loud])
+        self.assertEqual(db.search(Place, "!"), [])
+
+    def test_db_storage_table_stats(self):
+        """DBStorage ranks like FileStorage, whole words only counting"""
+        storage._FileStorage__objects.clear()
+        db = DBStorage.__new__(DBStorage)
+        db._DBStorage__engine = create_engine('sqlite://')
+        db.reload()
+        texts = ["quiet cabin with a view of the hills", "beach beach",
+                 "beach house", "fun_bar", "funxbar"] + \
+            ["a plain room in town"] * 30 + ["Sunbeach villa"] * 5 + \
+            ["Beaches, beaches everywhere"] * 5
+        places = [Place(name="Place", city_id="1", user_id="1",
+                        latitude=0.0, longitude=0.0, description=text)
+                  for text in texts]
+        for place in places:
+            storage.new(place)
+            db.new(place)
+        db.save()
+        found = [place.id for place in db.search(Place, "quiet beach")]
+        self.assertEqual(found, [places[i].id for i in (1, 2, 0)])
+        self.assertEqual(found, [place.id for place in
+                                 storage.search(Place, "quiet beach")])
+        self.assertEqual([place.id for place in db.search(Place, "fun_bar")],
+                         [places[3].id])
+        self.assertEqual([place.id for place in db.search(Place, "beach")],
+                         [places[i].id for i in (1, 2)])
+        self.assertEqual(_escape_like("5%_off\\"), "5\\%\\_off\\\\")
+
+
+if __name__ == "__main__":
+    unittest.main()